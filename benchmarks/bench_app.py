@@ -0,0 +1,153 @@
+"""
+Headless rerun-latency benchmark for hackthon_app.py.
+
+Drives every sidebar tab through Streamlit's AppTest, scripting the same
+widgets a user would, and records per tab:
+  - cold rerun latency, with every process-wide cache cleared
+  - warm rerun latency, repeating the same selection
+  - peak Python memory (tracemalloc) during those reruns
+Results are written as JSON so runs on different commits can be diffed:
+
+    python benchmarks/bench_app.py --runs 5 --output bench.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+import streamlit  # noqa: E402
+
+import hotels  # noqa: E402
+import query_backends  # noqa: E402
+import station_bot  # noqa: E402
+import train_charts  # noqa: E402
+import train_data  # noqa: E402
+
+APP_PATH = os.path.join(REPO_ROOT, 'hackthon_app.py')
+TABS = ['Trains', 'Passenger', 'Hotel', 'Station Bot']
+
+# Selection scripted on the dashboard tabs
+TRAVEL_DATE = date(2025, 1, 2)
+STATION = "London St Pancras Int'l"
+HOUR_RANGE = (5, 22)
+BOT_MESSAGE = 'hello'
+
+
+def clear_process_caches():
+    # Every cache the app fills, so a tab's first run after this is really cold
+    train_data._read_dataset.cache_clear()
+    train_data._read_hourly.cache_clear()
+    train_data._partitioned_dataset.cache_clear()
+    train_data._LIVE_DATA.clear()
+    train_data.FILTER_CACHE.clear()
+    train_data.RANGE_CACHE.clear()
+    query_backends._open_database.cache_clear()
+    train_charts.CHART_CACHE.clear()
+    train_charts._explorer_template.cache_clear()
+    station_bot.INDEX_CACHE.clear()
+    hotels._read_hotels.cache_clear()
+
+
+def script_widgets(at, tab):
+    """Sets the tab's widgets to the benchmark selection, without running."""
+    if tab in ('Trains', 'Passenger'):
+        at.date_input(key='travel_date').set_value(TRAVEL_DATE)
+        at.selectbox[0].set_value(STATION)
+        at.slider[0].set_value(HOUR_RANGE)
+    elif tab == 'Hotel':
+        at.selectbox[0].set_value(STATION)
+        at.date_input(key='checkin_date').set_value(TRAVEL_DATE)
+        at.button(key='hotel_button').click()
+    else:
+        at.text_input(key='user_input').input(BOT_MESSAGE)
+        at.button[0].click()
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(f'app raised during benchmark: {at.exception[0].value}')
+    return elapsed_ms
+
+
+def bench_tab(tab, runs, timeout):
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    at.sidebar.radio[0].set_value(tab)
+    at.run()
+
+    clear_process_caches()
+    script_widgets(at, tab)
+    cold_ms = timed_run(at)
+    warm_ms = []
+    for _ in range(runs):
+        script_widgets(at, tab)
+        warm_ms.append(timed_run(at))
+
+    # Memory is traced in a separate cold + warm pass, tracemalloc slows everything down
+    tracemalloc.start()
+    clear_process_caches()
+    for _ in range(2):
+        script_widgets(at, tab)
+        timed_run(at)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'cold_ms': round(cold_ms, 2),
+        'warm_ms': [round(ms, 2) for ms in warm_ms],
+        'warm_median_ms': round(statistics.median(warm_ms), 2),
+        'warm_p95_ms': round(sorted(warm_ms)[math.ceil(len(warm_ms) * 0.95) - 1], 2),
+        'peak_mem_mb': round(peak / 1e6, 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='warm reruns per tab')
+    parser.add_argument('--tabs', nargs='+', default=TABS, choices=TABS)
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed per rerun')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    # The app opens data/data.csv relative to the working directory
+    os.chdir(REPO_ROOT)
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'streamlit': streamlit.__version__,
+        'runs': args.runs,
+        'tabs': {tab: bench_tab(tab, args.runs, args.timeout) for tab in args.tabs},
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+pandas vs SQLite query backends for the Trains and Passenger dashboards.
+
+Each backend runs in a fresh interpreter, so its memory is measured alone:
+the time to open it and the process RSS it adds, then the median latency of the uncached station/date/hour filter and hourly
+sums over every station and date. The two backends' results are checked
+against each other first:
+
+    python benchmarks/bench_backends.py --repeats 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import query_backends  # noqa: E402
+import train_data  # noqa: E402
+
+# The columns the Trains tab loads; the Passenger tab's sums use PASSENGER_COLUMNS
+TRAINS_COLUMNS = [
+    'train_no', 'scheduled_dt', 'route', 'carrier', 'eq_code', 'set_no', 'dep_delay', 'arr_delay', 'station',
+    'country', 'latitude', 'longitude', 'zoom', 'hr', 'group', 'assistance', 'duty', 'premier', 'plus', 'standard',
+    'wheelchair_companion', 'wheelchair', 'senior', 'adult', 'youth', 'child', 'guide_dog',
+]
+HOUR_RANGE = (7, 20)
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def open_backend(name):
+    if name == 'SQLite':
+        return query_backends.sqlite_backend(train_data.TRAIN_DATA_PATH, TRAINS_COLUMNS)
+    return query_backends.PandasBackend(
+        train_data.load_dataset(train_data.TRAIN_DATA_PATH, TRAINS_COLUMNS), train_data.load_hourly(train_data.TRAIN_DATA_PATH),
+    )
+
+
+def selections(backend):
+    days = [date.fromordinal(day) for day in range(backend.min_date.toordinal(), backend.max_date.toordinal() + 1)]
+    return [(station, day) for station in backend.stations for day in days]
+
+
+def median_ms(query, points, repeats):
+    timings = []
+    for station, day in points:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            query(station, day)
+        timings.append((time.perf_counter() - start) / repeats * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def measure(name, repeats):
+    """Runs in the child process: opens one backend and times its queries."""
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    backend = open_backend(name)
+    open_ms = (time.perf_counter() - start) * 1000
+    rss_added = rss_mb() - rss_before
+    points = selections(backend)
+    return {
+        'open_ms': round(open_ms, 1),
+        'rss_mb': round(rss_added, 2),
+        'median_ms': {
+            'filter': median_ms(lambda station, day: backend.filter(station, day, *HOUR_RANGE), points, repeats),
+            'hourly_sums': median_ms(
+                lambda station, day: backend.hourly_sums(station, day, *HOUR_RANGE, train_data.PASSENGER_COLUMNS), points, repeats,
+            ),
+        },
+    }
+
+
+def check_equal():
+    pandas_backend, sqlite_backend = open_backend('pandas'), open_backend('SQLite')
+    for station, day in selections(pandas_backend):
+        expected = pandas_backend.filter(station, day, *HOUR_RANGE).reset_index(drop=True)
+        actual = sqlite_backend.filter(station, day, *HOUR_RANGE)
+        assert expected.astype(str).equals(actual.astype(str)), (station, day)
+        expected = pandas_backend.hourly_sums(station, day, *HOUR_RANGE, train_data.HOURLY_SUM_COLUMNS)
+        actual = sqlite_backend.hourly_sums(station, day, *HOUR_RANGE, train_data.HOURLY_SUM_COLUMNS)
+        assert (expected.to_numpy() == actual.to_numpy()).all() and len(expected) == len(actual), (station, day)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=3, help='queries timed per station and date')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--child', choices=query_backends.BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # The app opens data/data.csv relative to the working directory
+    os.chdir(REPO_ROOT)
+    if args.child:
+        print(json.dumps(measure(args.child, args.repeats)))
+        return
+    # Also builds the columnar, hourly and SQLite files, so the children only open them
+    check_equal()
+    results = {}
+    for name in query_backends.BACKENDS:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', name, '--repeats', str(args.repeats)],
+            capture_output=True, text=True, check=True,
+        )
+        results[name] = json.loads(child.stdout)
+    text = json.dumps({'hour_range': HOUR_RANGE, 'backends': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Serial vs parallel rendering of the Trains tab's static charts.
+
+Drives the Trains tab through AppTest with the "Static images" chart
+backend, clearing the chart cache before every rerun so all eight figures
+are rendered, once with the parallel toggle off and once with it on.
+The render pool is started before timing, so its spawn cost is reported
+separately rather than folded into the first parallel rerun:
+
+    python benchmarks/bench_charts.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+import pandas as pd
+from bench_app import APP_PATH, REPO_ROOT, git_commit, script_widgets
+from streamlit.testing.v1 import AppTest
+
+import train_charts
+
+
+def bench_mode(parallel, runs, timeout):
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    script_widgets(at, 'Trains')
+    at.radio(key='chart_backend').set_value('Static images')
+    at.run()
+    at.toggle(key='parallel_charts').set_value(parallel)
+    at.run()
+    timings = []
+    for _ in range(runs):
+        train_charts.CHART_CACHE.clear()
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(f'app raised during benchmark: {at.exception[0].value}')
+    return {
+        'rerun_ms': [round(ms, 2) for ms in timings],
+        'median_ms': round(statistics.median(timings), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='reruns per mode')
+    parser.add_argument('--workers', type=int, default=train_charts.RENDER_WORKERS, help='render pool processes')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed per rerun')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    # The app opens data/data.csv relative to the working directory
+    os.chdir(REPO_ROOT)
+    train_charts.RENDER_WORKERS = args.workers
+    start = time.perf_counter()
+    # One small chart per worker makes every process import matplotlib and seaborn before timing starts
+    counts = pd.Series([1], index=['warm-up'])
+    list(train_charts.render_pool().map(
+        train_charts.render_chart,
+        [train_charts.pie_figure] * train_charts.RENDER_WORKERS,
+        [(counts, 'Set3', 'warm-up')] * train_charts.RENDER_WORKERS,
+    ))
+    pool_start_ms = (time.perf_counter() - start) * 1000
+    serial = bench_mode(False, args.runs, args.timeout)
+    parallel = bench_mode(True, args.runs, args.timeout)
+    results = {
+        'commit': git_commit(),
+        'cpus': os.cpu_count(),
+        'render_workers': train_charts.RENDER_WORKERS,
+        'pool_start_ms': round(pool_start_ms, 2),
+        'serial': serial,
+        'parallel': parallel,
+        'speedup': round(serial['median_ms'] / parallel['median_ms'], 2),
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
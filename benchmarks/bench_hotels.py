@@ -0,0 +1,80 @@
+"""
+Latency of the hotel searches behind the Hotel tab.
+
+Builds a synthetic set of hotels around the stations in data.csv (the
+bundled data/hotels.csv holds 2,200), checks the grid index against a
+brute-force haversine scan and times nearest-N and radius queries from
+every station:
+
+    python benchmarks/bench_hotels.py --hotels 300000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import hotels  # noqa: E402
+import train_data  # noqa: E402
+
+
+def median_ms(search, points, repeats):
+    timings = []
+    for lat, lon in points:
+        search(lat, lon)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            search(lat, lon)
+        timings.append((time.perf_counter() - start) / repeats * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hotels', type=int, default=300_000)
+    parser.add_argument('--repeats', type=int, default=100, help='queries timed per station')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    stations = hotels.station_coordinates(train_data.load_dataset(columns=['station', 'scheduled_dt', 'latitude', 'longitude']).frame)
+    sample = hotels.sample_hotels(stations, args.hotels, seed=1)
+    start = time.perf_counter()
+    index = hotels.HotelIndex(sample)
+    build_ms = (time.perf_counter() - start) * 1000
+    points = list(stations.itertuples(index=False, name=None))
+
+    lats, lons = sample['latitude'].to_numpy(), sample['longitude'].to_numpy()
+    for lat, lon in points:
+        distances = hotels.haversine_km(lat, lon, lats, lons)
+        assert set(index.within(lat, lon, 1.0)['hotel_id']) == set(sample['hotel_id'][distances <= 1.0])
+        assert (index.nearest(lat, lon, 10)['hotel_id'].to_numpy() == sample['hotel_id'].to_numpy()[distances.argsort(kind='stable')[:10]]).all()
+
+    results = {
+        'hotels': args.hotels,
+        'cell_degrees': index.cell_degrees,
+        'build_ms': round(build_ms, 1),
+        'median_ms': {
+            'nearest_10': median_ms(lambda lat, lon: index.nearest(lat, lon, 10), points, args.repeats),
+            'nearest_50': median_ms(lambda lat, lon: index.nearest(lat, lon, 50), points, args.repeats),
+            'within_0.5km': median_ms(lambda lat, lon: index.within(lat, lon, 0.5), points, args.repeats),
+            'within_2km': median_ms(lambda lat, lon: index.within(lat, lon, 2.0), points, args.repeats),
+            'brute_force_nearest_10': median_ms(
+                lambda lat, lon: hotels.haversine_km(lat, lon, lats, lons).argpartition(10)[:10], points, max(1, args.repeats // 10),
+            ),
+        },
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
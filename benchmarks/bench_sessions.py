@@ -0,0 +1,79 @@
+"""
+Memory cost of each additional session of hackthon_app.py.
+
+Opens N AppTest sessions in one process, each selecting the same tab and
+widgets (with the train map shown, where the app has that toggle), and keeps
+them all alive. After every session it records process RSS and the Python
+memory still allocated (tracemalloc) once garbage is collected. The marginal
+cost per session is the mean increase after the first session:
+
+    python benchmarks/bench_sessions.py --sessions 10 --tab Trains
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import tracemalloc
+
+from bench_app import APP_PATH, REPO_ROOT, TABS, git_commit, script_widgets
+from streamlit.testing.v1 import AppTest
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+
+def open_session(tab, timeout):
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    at.sidebar.radio[0].set_value(tab)
+    at.run()
+    script_widgets(at, tab)
+    if any(toggle.key == 'show_map' for toggle in at.toggle):
+        at.toggle(key='show_map').set_value(True)
+    at.run()
+    if at.exception:
+        raise RuntimeError(f'app raised during benchmark: {at.exception[0].value}')
+    return at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--tab', default='Trains', choices=TABS)
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed per rerun')
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    args = parser.parse_args()
+
+    # The app opens data/data.csv relative to the working directory
+    os.chdir(REPO_ROOT)
+    tracemalloc.start()
+    sessions, rss, traced = [], [], []
+    for _ in range(args.sessions):
+        sessions.append(open_session(args.tab, args.timeout))
+        gc.collect()
+        rss.append(rss_mb())
+        traced.append(tracemalloc.get_traced_memory()[0] / 1e6)
+    tracemalloc.stop()
+
+    results = {
+        'commit': git_commit(),
+        'tab': args.tab,
+        'sessions': args.sessions,
+        'rss_mb': [round(value, 2) for value in rss],
+        'traced_mb': [round(value, 3) for value in traced],
+        'rss_per_added_session_mb': round(statistics.mean(b - a for a, b in zip(rss, rss[1:])), 3),
+        'traced_per_added_session_mb': round(statistics.mean(b - a for a, b in zip(traced, traced[1:])), 3),
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Equivalence checks for the train data paths that replace a plain read_csv
+and boolean mask. Each check compares a fast path against the slow, obvious
+computation over data/data.csv and stops at the first difference:
+
+  - index: StationDateHourIndex lookups vs a mask over the frame
+  - appends: LiveTrainData fed the file in random-sized chunks vs a full load
+  - raw: the compacted ingest copy vs the raw CSV cleaned per rerun, as the
+    dashboards used to
+
+    python benchmarks/check_data.py --seed 0
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import train_data  # noqa: E402
+
+# Start/end hours checked for every station and date, including empty and inverted ranges
+HOUR_RANGES = [(5, 22), (0, 24), (7, 10), (12, 13), (22, 5), (9, 9)]
+CHECKS = ['index', 'appends', 'raw']
+
+
+def selections(dataset):
+    dates = sorted(dataset.frame['scheduled_dt'].unique())
+    return [(station, day, start, end) for station in dataset.stations for day in dates for start, end in HOUR_RANGES]
+
+
+def mask_positions(frame, station, travel_date, start_hour, end_hour):
+    mask = (
+        (frame['station'] == station) & (frame['scheduled_dt'] == travel_date)
+        & (frame['hr'] >= start_hour) & (frame['hr'] < end_hour)
+    )
+    return np.flatnonzero(mask)
+
+
+def assert_same_rows(expected, actual, context):
+    assert list(expected.columns) == list(actual.columns), (context, 'columns')
+    assert len(expected) == len(actual), (context, 'rows')
+    for col in expected.columns:
+        left, right = expected[col], actual[col]
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            # Values, whatever width ingest narrowed them to; NaN matches NaN
+            same = np.array_equal(left.to_numpy(float), right.to_numpy(float), equal_nan=True)
+        else:
+            # Categoricals compare by label
+            same = (left.astype(str).to_numpy() == right.astype(str).to_numpy()).all()
+        assert same, (context, col)
+
+
+def assert_same_positions(expected, actual, context):
+    # Both index frames already checked equal, so the same positions in the same order mean the same rows
+    assert np.array_equal(expected, actual), context
+
+
+def assert_same_sums(expected, actual, context):
+    assert list(expected.columns) == list(actual.columns), (context, 'columns')
+    assert np.array_equal(expected.to_numpy(float), actual.to_numpy(float)), context
+
+
+def check_index(path):
+    """The index, and so dataset.filter(), selects the rows, in order, that a mask over the frame does."""
+    dataset = train_data.load_dataset(path)
+    for selection in selections(dataset):
+        assert_same_positions(mask_positions(dataset.frame, *selection), dataset.index.positions(*selection), selection)
+
+
+def check_appends(path, rng):
+    """Following the CSV as it is appended to gives the same data as loading the whole file."""
+    with open(path, 'rb') as source_file:
+        content = source_file.read()
+    full = train_data.LiveTrainData(path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        live_path = os.path.join(tmp_dir, os.path.basename(path))
+        # Start from the first half, then add the rest in chunks that may end mid-line
+        written = content.index(b'\n', len(content) // 2) + 1
+        with open(live_path, 'wb') as live_file:
+            live_file.write(content[:written])
+        live = train_data.LiveTrainData(live_path)
+        while written < len(content):
+            chunk = rng.randint(1, 32768)
+            with open(live_path, 'ab') as live_file:
+                live_file.write(content[written:written + chunk])
+            written += chunk
+            live.refresh()
+    expected, actual = full.dataset(), live.dataset()
+    assert expected.stations == actual.stations, 'stations'
+    assert (expected.min_date, expected.max_date) == (actual.min_date, actual.max_date), 'date bounds'
+    assert_same_rows(expected.frame, actual.frame, 'frame')
+    for selection in selections(expected):
+        assert_same_positions(expected.index.positions(*selection), actual.index.positions(*selection), selection)
+        assert_same_sums(full.hourly.sums(*selection), live.hourly.sums(*selection), ('hourly', selection))
+
+
+def raw_rows(path):
+    """The CSV as the dashboards used to read and clean it on every rerun, delays aside."""
+    df = pd.read_csv(path, parse_dates=['scheduled_dt'])
+    df['scheduled_dt'] = df['scheduled_dt'].dt.date
+    df = df.replace('-', None)
+    # Except for the delays, which stay missing when none was recorded
+    filled = [col for col in df.columns if col not in train_data.DELAY_COLUMNS]
+    df[filled] = df[filled].fillna(0)
+    for col in train_data.CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype(str)
+    for col in train_data.DELAY_COLUMNS + train_data.INT_COLUMNS:
+        df[col] = pd.to_numeric(df[col])
+    return df
+
+
+def check_raw(path):
+    """The ingest copy holds the raw CSV's values, so filters and hourly sums over it match."""
+    raw = raw_rows(path)
+    dataset = train_data.load_dataset(path)
+    hourly = train_data.load_hourly(path)
+    for col in train_data.COORDINATE_COLUMNS:
+        # Stored as float32, within a metre of the CSV
+        assert np.allclose(raw[col], dataset.frame[col], atol=1e-5), col
+    exact = [col for col in raw.columns if col not in train_data.COORDINATE_COLUMNS]
+    assert_same_rows(raw[exact], dataset.frame[exact], 'frame')
+    counts = raw[['hr'] + train_data.HOURLY_SUM_COLUMNS]
+    for selection in selections(dataset):
+        positions = mask_positions(raw, *selection)
+        assert_same_positions(positions, dataset.index.positions(*selection), selection)
+        sums = counts.iloc[positions].groupby('hr').sum().reset_index()
+        assert_same_sums(sums, hourly.sums(*selection), ('hourly', selection))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checks', nargs='+', default=CHECKS, choices=CHECKS)
+    parser.add_argument('--seed', type=int, default=0, help='seeds the append chunk sizes')
+    args = parser.parse_args()
+
+    # The app opens data/data.csv relative to the working directory
+    os.chdir(REPO_ROOT)
+    path = train_data.TRAIN_DATA_PATH
+    for check in args.checks:
+        if check == 'index':
+            check_index(path)
+        elif check == 'appends':
+            check_appends(path, random.Random(args.seed))
+        else:
+            check_raw(path)
+        print(f'{check}: ok')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,38 +1,98 @@
-from datetime import date
+from datetime import timedelta
+import os
+import time
+import uuid
 import streamlit as st
-import matplotlib.pyplot as plt
-import pandas as pd
-import pydeck as pdk
-import random
-import seaborn as sns
 import folium
+import hotels
 from streamlit_folium import st_folium
-import hashlib
-import plotly.express as px
-
-# Load sample data
-def load_train_data():
-    df = pd.read_csv('data/data.csv')
-    return df
-
-# Helper functions
-# Function to generate a random RGBA color
-def random_color():
-    return [random.randint(0, 100) for _ in range(3)] + [random.randint(100, 255)]  # RGB + Alpha (opacity)
-
-# Function to add slight random variation to the coordinates
-def add_variation(lat, lon, max_variation=0.001):
-    """
-    Adds a small random variation to the latitude and longitude.
-    This prevents all markers from stacking on the same point.
-    """
-    lat_variation = random.uniform(-max_variation, max_variation)
-    lon_variation = random.uniform(-max_variation, max_variation)
-    return lat + lat_variation, lon + lon_variation
-
-# Create a hash of the DataFrame to detect changes
-def dataframe_hash(df):
-    return hashlib.md5(pd.util.hash_pandas_object(df).values).hexdigest()
+import passenger_charts
+import prefetch
+import profiling
+import query_backends
+import session_store
+import station_bot
+import tables
+import train_charts
+import train_data
+import train_map
+
+# Set STATION_APP_LIVE_DATA=1 when data.csv is appended to while the app runs:
+# only the new rows are parsed and merged, instead of re-reading the whole file
+LIVE_DATA = os.environ.get("STATION_APP_LIVE_DATA") == "1"
+# First and last hour the departure time sliders offer
+DEPARTURE_HOURS = (5, 22)
+# What each session may keep across reruns; everything bounded lives in its SessionStore
+SESSION_BUDGETS = {
+    "messages": session_store.Budget("ring", station_bot.CHAT_HISTORY_BYTES, station_bot.CHAT_HISTORY_SIZE),
+    # Recent hotel searches, so results stay up while other widgets rerun the page
+    "hotel_results": session_store.Budget("lru", 2_000_000, 8),
+}
+
+# A random id per browser session, for the shared prefetcher and the session memory report
+def session_id():
+    return st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+# This session's bounded storage, created on its first rerun
+def get_session_store():
+    if "store" not in st.session_state:
+        st.session_state["store"] = session_store.SessionStore(session_id(), SESSION_BUDGETS)
+    return st.session_state["store"]
+
+# Load sample data (parsed once per process, re-read when the file changes)
+def load_train_data(columns=None):
+    if LIVE_DATA:
+        return train_data.live_data(train_data.TRAIN_DATA_PATH).dataset(columns)
+    return train_data.load_dataset(train_data.TRAIN_DATA_PATH, columns)
+
+# Hourly sums per station/date, precomputed at ingest
+def load_hourly_data():
+    if LIVE_DATA:
+        return train_data.live_data(train_data.TRAIN_DATA_PATH).hourly
+    return train_data.load_hourly(train_data.TRAIN_DATA_PATH)
+
+# Filters and hourly sums for the dashboards, answered in memory by pandas or pushed down to SQLite;
+# the sidebar switch lets the two be compared in the profiler. Live data only exists in memory.
+def load_backend(columns):
+    if st.session_state.get("query_backend") == "SQLite" and not LIVE_DATA:
+        return query_backends.sqlite_backend(train_data.TRAIN_DATA_PATH, columns)
+    return query_backends.PandasBackend(load_train_data(columns), load_hourly_data())
+
+# Rows of several stations over a date range; read from the scheduled_dt partitions, or from memory for live data
+def load_range_data(stations, start_date, end_date, columns):
+    if LIVE_DATA:
+        frame = train_data.live_data(train_data.TRAIN_DATA_PATH).dataset().frame
+        return train_data.range_rows(frame, stations, start_date, end_date, columns)
+    return train_data.load_range(train_data.TRAIN_DATA_PATH, stations, start_date, end_date, columns)
+
+# The eight Trains charts as one Vega-Lite spec holding the whole day, cached per station and date:
+# the chart's own hour sliders filter it in the browser, so moving them never reaches the server
+def explorer_chart(backend, station, travel_date):
+    chart_params = (backend.name, backend.version, station, travel_date)
+    def build():
+        day_rows = backend.view(station, travel_date, *DEPARTURE_HOURS).frame
+        return train_charts.hourly_explorer(day_rows, DEPARTURE_HOURS)
+    return train_charts.chart_spec("hourly explorer", chart_params, build)
+
+# Fills the shared caches for a selection before anyone asks for it; runs on the prefetch threads
+def warm_selection(backend, station, travel_date, start_hour, end_hour, interactive_charts):
+    backend.view(station, travel_date, start_hour, end_hour)
+    # Eight static PNGs per neighbour would cost more CPU than the hits save, so only interactive charts are prepared ahead
+    if interactive_charts:
+        explorer_chart(backend, station, travel_date)
+
+# Queues the neighbouring dates and stations of the selection just served, replacing this session's previous batch
+def prefetch_neighbours(backend, station, travel_date, start_hour, end_hour, interactive_charts=False):
+    owner = session_id()
+    neighbours = prefetch.adjacent_selections(backend.stations, station, travel_date, backend.min_date, backend.max_date)
+    tasks = [
+        (
+            (backend.name, backend.version, backend.column_names, neighbour, day, start_hour, end_hour, interactive_charts),
+            lambda neighbour=neighbour, day=day: warm_selection(backend, neighbour, day, start_hour, end_hour, interactive_charts),
+        )
+        for neighbour, day in neighbours
+    ]
+    prefetch.PREFETCHER.schedule(owner, tasks)
 
 # Set the page title and layout
 st.set_page_config(page_title="Station App UI", layout="wide")
@@ -146,365 +206,341 @@ st.markdown("<div class='header'>Hackathon Station App - 2024</div>", unsafe_all
 
 # Tabs using Streamlit Sidebar
 tab = st.sidebar.radio("Choose a Service", ["Trains", "Passenger", "Hotel", "Station Bot"])
-
-# Tab content handling
-if tab == "Trains":
-    st.markdown("<div class='subheader'>Trains</div>", unsafe_allow_html=True)
-    # Add extra space
-    st.markdown('<div class="extra-space"></div>', unsafe_allow_html=True)
-    # Train search form
-    with st.container():
-        st.title("Train Data Visualization")
+# Per-rerun timings of the named sections below
+show_profiler = st.sidebar.toggle("Show profiler", key="show_profiler")
+# Which engine answers the Trains and Passenger filters and hourly sums; the profiler shows each one's timings
+st.sidebar.radio("Query backend", query_backends.BACKENDS, horizontal=True, key="query_backend", disabled=LIVE_DATA,
+                 help="Live data is only held in memory, so it always uses pandas." if LIVE_DATA else None)
+profiler = profiling.Profiler()
+
+# Dashboards run as fragments: a widget inside one reruns only that function, not the whole page
+@st.fragment
+def trains_dashboard():
+    with profiling.fragment_rerun("Trains"):
         # Load data
-        df = load_train_data()
-        df = df[['train_no','scheduled_dt','route','carrier','eq_code','set_no','dep_delay','arr_delay','station','country','latitude','longitude','zoom','hr','group','assistance','duty','premier','plus','standard','wheelchair_companion','wheelchair','senior','adult','youth','child','guide_dog']]
+        with profiling.span("load"):
+            backend = load_backend(['train_no','scheduled_dt','route','carrier','eq_code','set_no','dep_delay','arr_delay','station','country','latitude','longitude','zoom','hr','group','assistance','duty','premier','plus','standard','wheelchair_companion','wheelchair','senior','adult','youth','child','guide_dog'])
         #Travel Date
-        df['scheduled_dt'] = pd.to_datetime(df['scheduled_dt']).dt.date
-        min_date = df['scheduled_dt'].min()
-        max_date = df['scheduled_dt'].max()
         travel_date = st.date_input("Select Travel Date",
-                                    min_value=min_date,
-                                    max_value=max_date,
+                                    min_value=backend.min_date,
+                                    max_value=backend.max_date,
                                     key="travel_date")
         #Boarding Station
-        boarding_station = df['station'].unique()
+        boarding_station = backend.stations
         # Create the dropdown
         selected_station = st.selectbox('Select A Boarding Station', boarding_station)
+        # Title of the Dashboard
+        st.title("Train Data Dashboard")
+        # Interactive charts get every row of the day once and apply their own hour sliders in the browser,
+        # static ones are matplotlib PNGs rendered on the server for the hours selected below
+        chart_backend = st.radio("Chart backend", ["Interactive", "Static images"], horizontal=True, key="chart_backend")
+        if chart_backend == "Interactive":
+            # A cached, already validated spec, sent again only when the station or date changes
+            spec = explorer_chart(backend, selected_station, travel_date)
+            with profiling.span("chart: send"):
+                st.vega_lite_chart(spec=spec)
+        trains_selection(backend, selected_station, travel_date, chart_backend)
+        with st.expander("Date range across stations"):
+            range_report("Trains", "trains_range", backend, train_data.GROUP_COLUMNS + train_data.CLASS_COLUMNS + train_data.PASSENGER_TYPE_COLUMNS, train_data.DELAY_COLUMNS)
+
+
+# The hour slider reruns only this fragment: the table, the map and the static charts follow it,
+# the interactive charts above keep their own hour sliders and are not sent again
+@st.fragment
+def trains_selection(backend, selected_station, travel_date, chart_backend):
+    with profiling.fragment_rerun("Trains"):
         # Range slider for selecting time range (5 AM to 10 PM)
         start_hour, end_hour = st.slider(
             "Select departure time range",
-            min_value=5,  # No leading zero
-            max_value=22,
-            value=(5, 22),  # No leading zero
+            min_value=DEPARTURE_HOURS[0],
+            max_value=DEPARTURE_HOURS[1],
+            value=DEPARTURE_HOURS,
             step=1,
+            help="Filters the table, the map and the static charts. The interactive charts have their own hour sliders.",
         )
         # Filter data based on selected time range
-        filtered_data = df[((df['hr'] >= start_hour) & (df['hr'] < end_hour)) & (df['station'] == selected_station) & (df['scheduled_dt'] == travel_date)]
-        filtered_data.replace('-', None, inplace=True)
-        # Replace None or NaN values with 0
-        filtered_data = filtered_data.fillna(0)
-        st.write(filtered_data)
-        # Title of the Dashboard
-        st.title("Train Data Dashboard")
-        col1, col2 = st.columns(2)
-        # 1. Route Plot
-        with col1:
-            st.subheader("1. Route By Hour")
-            route_counts = filtered_data['route'].value_counts()
-            fig_route = plt.figure(figsize=(8, 6))
-            plt.pie(route_counts, labels=route_counts.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("Set3", len(route_counts)))
-            plt.title("Route Distribution")
-            st.pyplot(fig_route)
-        # 2. Carrier Plot
-        with col2:
-            st.subheader("2. Carrier By Hour")
-            carrier_counts = filtered_data['carrier'].value_counts()
-            fig_carrier = plt.figure(figsize=(8, 6))
-            plt.pie(carrier_counts, labels=carrier_counts.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("Set2", len(carrier_counts)))
-            plt.title("Carrier Distribution")
-            st.pyplot(fig_carrier)
-        # Empty space for better alignment between rows
-        st.empty()
-        # 3. EQ_Code Plot
-        with col1:
-            st.subheader("3. Equipment Type By Hour")
-            eq_code_counts = filtered_data['eq_code'].value_counts()
-            fig_eq_code = plt.figure(figsize=(8, 6))
-            plt.pie(eq_code_counts, labels=eq_code_counts.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("Set1", len(eq_code_counts)))
-            plt.title("Equipment Type Distribution")
-            st.pyplot(fig_eq_code)
-        # 4. Set_No Plot
-        with col2:
-            st.subheader("4. Set Number By Hour")
-            set_no_counts = filtered_data['set_no'].value_counts()
-            fig_set_no = plt.figure(figsize=(8, 6))
-            plt.pie(set_no_counts, labels=set_no_counts.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette("Pastel1", len(set_no_counts)))
-            plt.title("Set Number Distribution")
-            st.pyplot(fig_set_no)
-        # Empty space for better alignment between the two rows
-        st.empty()
-        # 5. Arrival Delays Plot
-        with col1:
-            st.subheader("5. Arrival Delay By Hour")
-            filtered_data['status'] = filtered_data['arr_delay'].apply(lambda x: 'early' if x <= 0 else 'delayed')
-            fig_dep_delay = plt.figure(figsize=(10, 6))
-            sns.scatterplot(data=filtered_data, x='hr', y='arr_delay', hue='status', palette={'early': 'green', 'delayed': 'red'})
-            plt.axhline(0, color='black', linestyle='--', label="Baseline (on-time)")
-            plt.title("Arr Delay vs Hour")
-            plt.xlabel('Hour')
-            plt.ylabel('Arrival Delay')
-            plt.legend()
-            st.pyplot(fig_dep_delay)
-        # 6. Group, Assistance, Duty vs hr
-        with col2:
-            st.subheader("6. Group, Assistance, Duty Counts By Hour")
-            df_group = filtered_data.groupby('hr')[['group', 'assistance', 'duty']].sum().reset_index()
-            fig_group_assistance_duty = plt.figure(figsize=(10, 6))
-            sns.lineplot(data=df_group, x='hr', y='group', label='Group', color='blue', marker='*', linewidth=2)
-            sns.lineplot(data=df_group, x='hr', y='assistance', label='Assistance', color='orange', marker='^', linewidth=2)
-            sns.lineplot(data=df_group, x='hr', y='duty', label='Duty', color='green', marker='v', linewidth=2)
-            plt.title("Count of Group, Assistance, Duty vs Hour")
-            plt.xlabel('Hour')
-            plt.ylabel('Count')
-            plt.legend()
-            st.pyplot(fig_group_assistance_duty)
-        # Empty space for better alignment between rows
-        st.empty()
-        # 7. Premier, Plus, Standard, Wheelchair, Wheelchair Companion vs hr
-        with col1:
-            st.subheader("7. Premier, Plus, Standard, Wheelchair, Wheelchair Companion Counts By Hour")
-            df_wheelchair = filtered_data.groupby('hr')[['premier', 'plus', 'standard', 'wheelchair', 'wheelchair_companion']].sum().reset_index()
-            fig_wheelchair = plt.figure(figsize=(10, 6))
-            sns.lineplot(data=df_wheelchair, x='hr', y='premier', label='Premier', color='purple', marker='*', linewidth=2)
-            sns.lineplot(data=df_wheelchair, x='hr', y='plus', label='Plus', color='red', marker='^', linewidth=2)
-            sns.lineplot(data=df_wheelchair, x='hr', y='standard', label='Standard', color='blue', marker='v', linewidth=2)
-            sns.lineplot(data=df_wheelchair, x='hr', y='wheelchair', label='Wheelchair', color='green', marker='o', linewidth=2)
-            sns.lineplot(data=df_wheelchair, x='hr', y='wheelchair_companion', label='Wheelchair Companion', color='yellow', marker='|', linewidth=2)
-            plt.title("Count of Premier, Plus, Standard, Wheelchair, Wheelchair Companion vs Hour")
-            plt.xlabel('Hour')
-            plt.ylabel('Count')
-            plt.legend()
-            st.pyplot(fig_wheelchair)
-        # 8. Senior, Adult, Youth, Child, Guide Dog vs hr
-        with col2:
-            st.subheader("8. Senior, Adult, Youth, Child, Guide Dog Counts By Hour")
-            df_people = filtered_data.groupby('hr')[['senior', 'adult', 'youth', 'child', 'guide_dog']].sum().reset_index()
-            fig_people = plt.figure(figsize=(10, 6))
-            sns.lineplot(data=df_people, x='hr', y='senior', label='Senior', color='green', marker='*', linewidth=2)
-            sns.lineplot(data=df_people, x='hr', y='adult', label='Adult', color='purple', marker='^', linewidth=2)
-            sns.lineplot(data=df_people, x='hr', y='youth', label='Youth', color='cyan', marker='v', linewidth=2)
-            sns.lineplot(data=df_people, x='hr', y='child', label='Child', color='orange', marker='o', linewidth=2)
-            sns.lineplot(data=df_people, x='hr', y='guide_dog', label='Guide Dog', color='pink', marker='|', linewidth=2)
-            plt.title("Count of Senior, Adult, Youth, Child, Guide Dog vs Hour")
-            plt.xlabel('Hour')
-            plt.ylabel('Count')
-            plt.legend()
-            st.pyplot(fig_people)
-        # Empty space for better alignment between rows
-        st.empty()
+        # Memoized on the widget values; the data was already cleaned at ingest
+        with profiling.span(f"filter: {backend.name}"):
+            view = backend.view(selected_station, travel_date, start_hour, end_hour)
+        filtered_data = view.frame
+        result_table("Trains", "trains_table", filtered_data)
+        # Charts are cached per filter selection (and data version)
+        chart_params = (backend.name, backend.version, selected_station, travel_date, start_hour, end_hour)
+        if chart_backend == "Static images" and filtered_data.empty:
+            # Nothing to draw: a pie of no trains has no wedges
+            st.info("No trains match the selected date, station and time range.")
+        elif chart_backend == "Static images":
+            # Each figure is drawn on its own Agg canvas, so they can render side by side in worker processes
+            parallel = st.toggle("Render charts in parallel", key="parallel_charts")
+            with profiling.span(f"aggregate: {backend.name}"):
+                df_group = backend.hourly_sums(selected_station, travel_date, start_hour, end_hour, train_data.GROUP_COLUMNS)
+                df_wheelchair = backend.hourly_sums(selected_station, travel_date, start_hour, end_hour, train_data.CLASS_COLUMNS)
+                df_people = backend.hourly_sums(selected_station, travel_date, start_hour, end_hour, train_data.PASSENGER_TYPE_COLUMNS)
+            pngs = train_charts.chart_pngs([
+                ("route", train_charts.pie_figure, (filtered_data['route'].value_counts(), "Set3", "Route Distribution")),
+                ("carrier", train_charts.pie_figure, (filtered_data['carrier'].value_counts(), "Set2", "Carrier Distribution")),
+                ("eq_code", train_charts.pie_figure, (filtered_data['eq_code'].value_counts(), "Set1", "Equipment Type Distribution")),
+                ("set_no", train_charts.pie_figure, (filtered_data['set_no'].value_counts(), "Pastel1", "Set Number Distribution")),
+                ("arr_delay", train_charts.arrival_delay_figure, (filtered_data[['hr', 'arr_delay']],)),
+                ("group", train_charts.hourly_lines_figure, (df_group, train_charts.GROUP_LINES, "Count of Group, Assistance, Duty vs Hour")),
+                ("class", train_charts.hourly_lines_figure, (df_wheelchair, train_charts.CLASS_LINES, "Count of Premier, Plus, Standard, Wheelchair, Wheelchair Companion vs Hour")),
+                ("passenger_type", train_charts.hourly_lines_figure, (df_people, train_charts.PASSENGER_TYPE_LINES, "Count of Senior, Adult, Youth, Child, Guide Dog vs Hour")),
+            ], chart_params, train_charts.render_pool() if parallel else None)
+            col1, col2 = st.columns(2)
+            # 1. Route Plot
+            with col1:
+                st.subheader("1. Route By Hour")
+                st.image(pngs["route"], width="stretch")
+            # 2. Carrier Plot
+            with col2:
+                st.subheader("2. Carrier By Hour")
+                st.image(pngs["carrier"], width="stretch")
+            # Empty space for better alignment between rows
+            st.empty()
+            # 3. EQ_Code Plot
+            with col1:
+                st.subheader("3. Equipment Type By Hour")
+                st.image(pngs["eq_code"], width="stretch")
+            # 4. Set_No Plot
+            with col2:
+                st.subheader("4. Set Number By Hour")
+                st.image(pngs["set_no"], width="stretch")
+            # Empty space for better alignment between the two rows
+            st.empty()
+            # 5. Arrival Delays Plot
+            with col1:
+                st.subheader("5. Arrival Delay By Hour")
+                st.image(pngs["arr_delay"], width="stretch")
+            # 6. Group, Assistance, Duty vs hr
+            with col2:
+                st.subheader("6. Group, Assistance, Duty Counts By Hour")
+                st.image(pngs["group"], width="stretch")
+            # Empty space for better alignment between rows
+            st.empty()
+            # 7. Premier, Plus, Standard, Wheelchair, Wheelchair Companion vs hr
+            with col1:
+                st.subheader("7. Premier, Plus, Standard, Wheelchair, Wheelchair Companion Counts By Hour")
+                st.image(pngs["class"], width="stretch")
+            # 8. Senior, Adult, Youth, Child, Guide Dog vs hr
+            with col2:
+                st.subheader("8. Senior, Adult, Youth, Child, Guide Dog Counts By Hour")
+                st.image(pngs["passenger_type"], width="stretch")
+            # Empty space for better alignment between rows
+            st.empty()
+        with profiling.span("prefetch"):
+            prefetch_neighbours(backend, selected_station, travel_date, start_hour, end_hour, chart_backend == "Interactive")
+        train_map_section(view)
+
+
+# The map is only built when asked for, and its own widgets rerun just this fragment
+@st.fragment
+def train_map_section(view):
+    with profiling.fragment_rerun("Trains"):
         # Create the map with the filtered data
-        # Initialize session state to store colors and varied coordinates
-        if "marker_data" not in st.session_state:
-            st.session_state["marker_data"] = []
-        # Check if DataFrame has changed
-        df_hash = dataframe_hash(filtered_data)  # Get the hash of the current DataFrame
-        # Ensure that the DataFrame columns are converted to native Python types
-        df_filtered_data = filtered_data.applymap(lambda x: x.item() if hasattr(x, "item") else x)
-        # Only update if the DataFrame has changed
-        if "df_hash" not in st.session_state or st.session_state["df_hash"] != df_hash:
-            # Store the hash to track changes
-            st.session_state["df_hash"] = df_hash
-            # Rebuild the marker data if the DataFrame has changed
-            st.session_state["marker_data"] = []
-            for _, row in df_filtered_data.iterrows():
-                # Add variation to coordinates
-                varied_lat, varied_lon = add_variation(row["latitude"], row["longitude"])
-                # Generate random color
-                color = random_color()
-                # Append marker data to session state
-                st.session_state["marker_data"].append({
-                    "lat": float(varied_lat),
-                    "lon": float(varied_lon),
-                    "color": f"rgba({color[0]}, {color[1]}, {color[2]}, {color[3] / 255:.2f})",
-                    "popup": (
-                            f"<b>Train:</b> {row['train_no']}<br>"
-                            f"<b>Date:</b> {row['scheduled_dt']}<br>"
-                            f"<b>Hour:</b> {row['hr']}<br>"
-                            f"<b>Route:</b> {row['route']}<br>"
-                            f"<b>Carrier:</b> {row['carrier']}<br>"
-                            f"<b>Equipment:</b> {row['eq_code']}<br>"
-                            f"<b>Set:</b> {row['set_no']}<br>"
-                            f"<b>Station:</b> {row['station']}<br>"
-                            f"<b>Country:</b> {row['country']}<br>"
-                            f"<b>DepartureDelay:</b> {row['dep_delay']}<br>"
-                            f"<b>ArrivalDelay:</b> {row['arr_delay']}<br>"
-                            f"<b>Group:</b> {row['group']}<br>"
-                            f"<b>Assistance:</b> {row['assistance']}<br>"
-                            f"<b>Duty:</b> {row['duty']}<br>"
-                            f"<b>Premier:</b> {row['premier']}<br>"
-                            f"<b>Plus:</b> {row['plus']}<br>"
-                            f"<b>Standard:</b> {row['standard']}<br>"
-                            f"<b>Wheelchair:</b> {row['wheelchair']}<br>"
-                            f"<b>WheelchairCompanion:</b> {row['wheelchair_companion']}<br>"
-                            f"<b>Senior:</b> {row['senior']}<br>"
-                            f"<b>Adult:</b> {row['adult']}<br>"
-                            f"<b>Youth:</b> {row['youth']}<br>"
-                            f"<b>Child:</b> {row['child']}<br>"
-                            f"<b>GuideDog:</b> {row['guide_dog']}"
-                        ),
-                })
-        # Create a map centered around the first coordinate in the DataFrame
-        first_location = [df_filtered_data.iloc[0]["latitude"], df_filtered_data.iloc[0]["longitude"]]
-        zoom_start = int(df_filtered_data.iloc[0]["zoom"])
-        m = folium.Map(location=first_location, zoom_start=zoom_start, tiles="CartoDB Positron", attr="CartoDB Positron")
-        # Add markers with preserved session state data
-        for marker in st.session_state["marker_data"]:
-            folium.CircleMarker(
-                    location=[marker["lat"], marker["lon"]],
-                    radius=5,
-                    color=marker["color"],
-                    fill=True,
-                    fill_color=marker["color"],
-                    fill_opacity=0.8,
-                    popup=folium.Popup(marker["popup"], max_width=300),
-                ).add_to(m)
-        # Display map in Streamlit
         st.title("Train Information Map")
-        st_folium(m, width=725)
-        # Search Button
-        st.markdown("<div class='button-container'>", unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
-
-elif tab == "Passenger":
-    st.markdown("<div class='subheader'>Passenger</div>", unsafe_allow_html=True)
-    # Add extra space
-    st.markdown('<div class="extra-space"></div>', unsafe_allow_html=True)
-    # Train search form
-    with st.container():
-        st.title("Passenger Data Visualization")
+        if not st.toggle("Show train map", key="show_map"):
+            return
+        filtered_data = view.frame
+        if filtered_data.empty:
+            st.info("No trains match the selected date, station and time range.")
+            return
+        # Folium adds one marker per train; pydeck draws them all in a single WebGL layer.
+        # Either way a marker only carries its train number, and a click opens the details beside the map
+        map_backend = st.radio("Map backend", ["Folium", "pydeck"], horizontal=True, key="map_backend")
+        build_start = time.perf_counter()
+        if map_backend == "pydeck":
+            with profiling.span("marker build"):
+                deck = view.artifact("deck", train_map.build_deck)
+            payload_size = len(deck.to_json())
+        else:
+            # Jitter and colours are computed in bulk and are stable per train_no
+            with profiling.span("marker build"):
+                markers = view.artifact("markers", train_map.build_markers)
+            with profiling.span("map build"):
+                # Create a map centered around the first coordinate in the DataFrame
+                first_location = [float(filtered_data.iloc[0]["latitude"]), float(filtered_data.iloc[0]["longitude"])]
+                zoom_start = int(filtered_data.iloc[0]["zoom"])
+                m = folium.Map(location=first_location, zoom_start=zoom_start, tiles="CartoDB Positron", attr="CartoDB Positron")
+                # Add markers
+                for marker in markers.itertuples(index=False):
+                    folium.CircleMarker(
+                            location=[marker.lat, marker.lon],
+                            radius=5,
+                            color=marker.color,
+                            fill=True,
+                            fill_color=marker.color,
+                            fill_opacity=0.8,
+                            tooltip=train_map.MARKER_TOOLTIP.format(marker.train_no),
+                        ).add_to(m)
+            payload_size = len(m.get_root().render())
+        build_ms = (time.perf_counter() - build_start) * 1000
+        st.caption(f"{map_backend}: {len(filtered_data)} markers, {payload_size / 1024:.1f} KB payload, built in {build_ms:.1f} ms")
+        map_col, detail_col = st.columns([3, 2])
+        # Display map in Streamlit
+        with map_col, profiling.span("map render"):
+            if map_backend == "pydeck":
+                event = st.pydeck_chart(deck, on_select="rerun", selection_mode="single-object", key="train_deck")
+                selected = event.selection.objects.get(train_map.DECK_LAYER_ID, [])
+                train_no = selected[0]["train_no"] if selected else None
+            else:
+                # Only a click reruns the app; panning and zooming stay in the browser
+                clicked = st_folium(m, width=725, key="train_folium", returned_objects=["last_object_clicked_tooltip"])
+                train_no = train_map.clicked_train((clicked or {}).get("last_object_clicked_tooltip"))
+        with detail_col:
+            train_detail_panel(view, train_no)
+
+
+# Everything known about one train of the view, looked up when its marker is clicked
+def train_detail_panel(view, train_no):
+    positions = view.artifact("train index", train_map.train_index).get(train_no)
+    if positions is None:
+        st.info("Click a train on the map to see its details.")
+        return
+    st.subheader(train_map.MARKER_TOOLTIP.format(train_no))
+    st.dataframe(train_map.train_details(view.frame, positions))
+
+
+# The filtered rows one page at a time: search, sort and paging run here, and only the page is sent to the browser
+@st.fragment
+def result_table(label, key, frame):
+    with profiling.fragment_rerun(label):
+        columns = st.multiselect("Columns", list(frame.columns), default=list(frame.columns), key=f"{key}_columns")
+        search_col, sort_col, order_col, size_col = st.columns([3, 2, 1, 1])
+        search = search_col.text_input("Search", key=f"{key}_search").strip()
+        sort_by = sort_col.selectbox("Sort by", ["(as loaded)", *columns], key=f"{key}_sort")
+        descending = order_col.toggle("Descending", key=f"{key}_descending")
+        page_size = size_col.selectbox("Rows per page", tables.PAGE_SIZES, key=f"{key}_page_size")
+        if not columns:
+            st.info("Pick at least one column to show.")
+            return
+        with profiling.span("table"):
+            positions = tables.ordered_positions(frame, columns, search, None if sort_by == "(as loaded)" else sort_by, descending)
+            pages = tables.page_count(len(positions), page_size)
+            # A new search or page size can leave the remembered page past the end
+            if st.session_state.get(f"{key}_page", 1) > pages:
+                st.session_state[f"{key}_page"] = pages
+            page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+            rows = tables.table_page(frame, columns, positions, page, page_size)
+            # Delays stay missing in the data so averages skip them; the table shows them as 0, as it always has
+            st.dataframe(train_data.display_delays(rows), hide_index=True)
+        first = (page - 1) * page_size
+        matching = f" matching \"{search}\"" if search else ""
+        if len(positions):
+            st.caption(f"Page {page} of {pages}: rows {first + 1}-{first + len(rows)} of {len(positions)}{matching} ({len(frame)} loaded)")
+        else:
+            st.caption(f"No rows{matching} ({len(frame)} loaded)")
+
+
+# Week- and month-level totals for several stations; its widgets rerun just this fragment
+@st.fragment
+def range_report(label, key, backend, metrics, extra_columns=()):
+    with profiling.fragment_rerun(label):
+        stations = st.multiselect("Stations", backend.stations, default=backend.stations[:1], key=f"{key}_stations")
+        dates = st.date_input("Date range",
+                              value=(backend.min_date, min(backend.min_date + timedelta(days=6), backend.max_date)),
+                              min_value=backend.min_date,
+                              max_value=backend.max_date,
+                              key=f"{key}_dates")
+        grain = st.radio("Roll up by", ["Day", "Week", "Hour"], horizontal=True, key=f"{key}_grain").lower()
+        chosen = st.multiselect("Metrics", metrics, default=metrics[:3], key=f"{key}_metrics")
+        by_station = st.toggle("Split by station", key=f"{key}_by_station")
+        # The picker returns a single date while the end of the range is being chosen
+        if len(dates) != 2 or not stations or not chosen:
+            st.info("Pick one or more stations, a start and end date and at least one metric.")
+            return
+        with profiling.span("range load"):
+            rows = load_range_data(stations, dates[0], dates[1], ["hr", *chosen, *extra_columns])
+        with profiling.span("rollup"):
+            table = train_data.rollup(rows, grain, chosen, by_station)
+        st.caption(f"{len(rows)} departures on {rows['scheduled_dt'].nunique()} days")
+        if by_station:
+            st.line_chart(table, x=grain, y=chosen[0], color="station")
+        else:
+            st.line_chart(table, x=grain, y=chosen)
+        st.dataframe(table, hide_index=True)
+
+
+@st.fragment
+def passenger_dashboard():
+    with profiling.fragment_rerun("Passenger"):
         # Load data
-        df = load_train_data()
-        df = df[['train_no','scheduled_dt','station','latitude','longitude','zoom','hr','00~02','03~12','13~19','20~29','30~39','40~49','50~59','60~69','70~79','80~89','90~99','100+','eu_count','noneu_count','passeneger_counts','child_meal','dairy_free_meal','diabetic_meal','gluten_free_meal','kosher_meal','low_fat_meal','low_salt_meal','halal_meal','vegan_meal','vegetarian_meal','standard_meal']]
+        with profiling.span("load"):
+            backend = load_backend(['train_no','scheduled_dt','station','latitude','longitude','zoom','hr','00~02','03~12','13~19','20~29','30~39','40~49','50~59','60~69','70~79','80~89','90~99','100+','eu_count','noneu_count','passeneger_counts','child_meal','dairy_free_meal','diabetic_meal','gluten_free_meal','kosher_meal','low_fat_meal','low_salt_meal','halal_meal','vegan_meal','vegetarian_meal','standard_meal'])
         #Travel Date
-        df['scheduled_dt'] = pd.to_datetime(df['scheduled_dt']).dt.date
-        min_date = df['scheduled_dt'].min()
-        max_date = df['scheduled_dt'].max()
         travel_date = st.date_input("Select Travel Date",
-                                    min_value=min_date,
-                                    max_value=max_date,
+                                    min_value=backend.min_date,
+                                    max_value=backend.max_date,
                                     key="travel_date")
         #Boarding Station
-        boarding_station = df['station'].unique()
+        boarding_station = backend.stations
         # Create the dropdown
         selected_station = st.selectbox('Select A Boarding Station', boarding_station)
         # Range slider for selecting time range (5 AM to 10 PM)
         start_hour, end_hour = st.slider(
             "Select departure time range",
-            min_value=5,  # No leading zero
-            max_value=22,
-            value=(5, 22),  # No leading zero
+            min_value=DEPARTURE_HOURS[0],
+            max_value=DEPARTURE_HOURS[1],
+            value=DEPARTURE_HOURS,
             step=1,
         )
         # Filter data based on selected time range
-        filtered_data = df[((df['hr'] >= start_hour) & (df['hr'] < end_hour)) & (df['station'] == selected_station) & (df['scheduled_dt'] == travel_date)]
-        filtered_data.replace('-', None, inplace=True)
-        # Replace None or NaN values with 0
-        filtered_data = filtered_data.fillna(0)
-        st.write(filtered_data)
+        # Memoized on the widget values; the data was already cleaned at ingest
+        with profiling.span(f"filter: {backend.name}"):
+            view = backend.view(selected_station, travel_date, start_hour, end_hour)
+        filtered_data = view.frame
+        result_table("Passenger", "passenger_table", filtered_data)
         # Title of the Dashboard
         st.title("Pax Data Dashboard")
 
+        with profiling.span("prefetch"):
+            prefetch_neighbours(backend, selected_station, travel_date, start_hour, end_hour)
+        # Every Passenger chart reads its columns from this one wide hour-by-metric frame
+        with profiling.span(f"aggregate: {backend.name}"):
+            agg_data = backend.hourly_sums(selected_station, travel_date, start_hour, end_hour, train_data.PASSENGER_COLUMNS)
+
         # 1. EU/NonEu Plot
-        st.subheader("1. Pax By Nationality")
-        agg_data = filtered_data.groupby('hr').agg({
-            'eu_count': 'sum',
-            'noneu_count': 'sum'
-            }).reset_index()
-        # Prepare data for the donut plot
-        donut_data = agg_data[['eu_count', 'noneu_count']].sum().reset_index()
-        donut_data.columns = ['category', 'count']
-        # Create a donut plot
-        fig = px.pie(
-            donut_data,
-            names='category',
-            values='count',
-            title='Distribution of EU vs Non-EU Count',
-            hole=0.4  # This makes it a donut chart
-            )
-        # Display the plot in Streamlit
-        st.plotly_chart(fig)
+        with profiling.span("chart: nationality"):
+            st.subheader("1. Pax By Nationality")
+            st.plotly_chart(passenger_charts.nationality_figure(agg_data))
         # Empty space for better alignment between rows
         st.empty()
 
         # 2. Meal Plot
-        st.subheader("2. Meal By Hour")
-        agg_data = filtered_data.groupby('hr').agg({
-                'passeneger_counts': 'sum',
-                'child_meal': 'sum',
-                'dairy_free_meal': 'sum',
-                'diabetic_meal': 'sum',
-                'gluten_free_meal': 'sum',
-                'kosher_meal': 'sum',
-                'low_fat_meal': 'sum',
-                'low_salt_meal': 'sum',
-                'halal_meal': 'sum',
-                'vegan_meal': 'sum',
-                'vegetarian_meal': 'sum',
-                'standard_meal': 'sum'
-            }).reset_index()
-        # Melt the DataFrame for stacked bar chart
-        stacked_data = agg_data.melt(
-            id_vars=['hr', 'passeneger_counts'],
-            value_vars=[
-                    'child_meal', 'dairy_free_meal', 'diabetic_meal', 'gluten_free_meal',
-                    'kosher_meal', 'low_fat_meal', 'low_salt_meal', 'halal_meal',
-                    'vegan_meal', 'vegetarian_meal', 'standard_meal'
-                ],
-            var_name='meal_type',
-            value_name='meal_count'
-            )
-        # Create the stacked bar chart
-        fig = px.bar(
-                stacked_data,
-                x='hr',
-                y='meal_count',
-                color='meal_type',
-                title='Passenger Counts with Meal Distribution',
-                labels={'hr': 'Hour', 'meal_count': 'Meal Count'},
-                text_auto=True
-                )
-        # Add total passenger count as line on top
-        fig.add_scatter(
-                x=agg_data['hr'],
-                y=agg_data['passeneger_counts'],
-                mode='lines+markers',
-                name='Total Passengers',
-                line=dict(color='black', width=2, dash='dash')
-                )
-        # Display the plot in Streamlit
-        st.plotly_chart(fig)
+        with profiling.span("chart: meals"):
+            st.subheader("2. Meal By Hour")
+            st.plotly_chart(passenger_charts.meal_figure(agg_data))
         # Empty space for better alignment between rows
         st.empty()
 
         # 2. Pax Age Plot
-        st.subheader("3. Pax Age Group By Hour")
-        agg_data = filtered_data.groupby('hr').agg({
-                '00~02': 'sum',
-                '03~12': 'sum',
-                '13~19': 'sum',
-                '20~29': 'sum',
-                '30~39': 'sum',
-                '40~49': 'sum',
-                '50~59': 'sum',
-                '60~69': 'sum',
-                '70~79': 'sum',
-                '80~89': 'sum',
-                '90~99': 'sum',
-                '100+': 'sum'
-            }).reset_index()
-        # Melt the DataFrame for bar chart
-        bar_data = agg_data.melt(
-            id_vars=['hr'],
-            value_vars=[
-                '00~02', '03~12', '13~19', '20~29', '30~39', '40~49', 
-                '50~59', '60~69', '70~79', '80~89', '90~99', '100+'
-            ],
-            var_name='range',
-            value_name='count'
-        )
-        # Create the bar chart
-        fig = px.bar(
-            bar_data,
-            x='hr',
-            y='count',
-            color='range',
-            barmode='group',
-            title='Pax Age Group By Hour',
-            labels={'hr': 'Hour', 'count': 'Count', 'range': 'Range'}
-        )
-        # Display the chart in Streamlit
-        st.plotly_chart(fig)
+        with profiling.span("chart: age groups"):
+            st.subheader("3. Pax Age Group By Hour")
+            st.plotly_chart(passenger_charts.age_figure(agg_data))
+        with st.expander("Date range across stations"):
+            range_report("Passenger", "passenger_range", backend, train_data.PASSENGER_COLUMNS)
+
+
+# Tab content handling
+if tab == "Trains":
+    st.markdown("<div class='subheader'>Trains</div>", unsafe_allow_html=True)
+    # Add extra space
+    st.markdown('<div class="extra-space"></div>', unsafe_allow_html=True)
+    # Train search form
+    with st.container():
+        st.title("Train Data Visualization")
+        trains_dashboard()
+        # Search Button
+        st.markdown("<div class='button-container'>", unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
 
+elif tab == "Passenger":
+    st.markdown("<div class='subheader'>Passenger</div>", unsafe_allow_html=True)
+    # Add extra space
+    st.markdown('<div class="extra-space"></div>', unsafe_allow_html=True)
+    # Train search form
+    with st.container():
+        st.title("Passenger Data Visualization")
+        passenger_dashboard()
         st.markdown("<div class='button-container'>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
     
@@ -520,50 +556,77 @@ elif tab == "Hotel":
     st.markdown('<div class="extra-space"></div>', unsafe_allow_html=True)
     # Hotel search form
     # Load data
-    df = load_train_data()
+    with profiling.span("load"):
+        dataset = load_train_data(['station', 'scheduled_dt', 'latitude', 'longitude'])
+        hotel_index = hotels.load_hotels()
     with st.container():
         col1, col2 = st.columns(2)
         with col1:
              #Boarding Station
-            boarding_station = df['station'].unique()
+            boarding_station = dataset.stations
             # Create the dropdown
             destination = st.selectbox('Select A Boarding Station', boarding_station)
         with col2:
-            df['scheduled_dt'] = pd.to_datetime(df['scheduled_dt']).dt.date
-            min_date = df['scheduled_dt'].min()
-            max_date = df['scheduled_dt'].max()
             checkin_date = st.date_input("Select Travel Date",
-                                         min_value=min_date,
-                                         max_value=max_date,
+                                         min_value=dataset.min_date,
+                                         max_value=dataset.max_date,
                                          key="checkin_date")
+        # Nearest N hotels, or every hotel within a radius, of the station's coordinates
+        search_mode = st.radio("Search", ["Nearest hotels", "Within a radius"], horizontal=True, key="hotel_search_mode")
+        if search_mode == "Nearest hotels":
+            hotel_count = st.slider("Number of hotels", min_value=1, max_value=100, value=10, key="hotel_count")
+        else:
+            radius_km = st.slider("Radius (km)", min_value=0.5, max_value=20.0, value=2.0, step=0.5, key="hotel_radius")
         # Search Button
         st.markdown("<div class='button-container'>", unsafe_allow_html=True)
+        search_key = (destination, search_mode, hotel_count if search_mode == "Nearest hotels" else radius_km)
+        store = get_session_store()
         if st.button("Search Hotels", key="hotel_button", use_container_width=True):
-            st.write(f"Searching for hotels in {destination} for {checkin_date}.....")
+            station_lat, station_lon = hotels.station_coordinates(dataset.frame).loc[destination]
+            # Grid-indexed: only hotels in the cells around the station are measured
+            search_start = time.perf_counter()
+            with profiling.span("hotel search"):
+                if search_mode == "Nearest hotels":
+                    results = hotel_index.nearest(station_lat, station_lon, hotel_count)
+                else:
+                    results = hotel_index.within(station_lat, station_lon, radius_km)
+            search_ms = (time.perf_counter() - search_start) * 1000
+            store.put("hotel_results", search_key, {
+                "results": results, "lat": station_lat, "lon": station_lon, "search_ms": search_ms,
+            })
+        # The latest results for this selection, if it was searched recently
+        search = store.get("hotel_results", search_key)
+        if search is not None:
+            results = search["results"]
+            st.write(f"{len(results)} hotels near {destination} for {checkin_date}, found among {len(hotel_index):,} in {search['search_ms']:.2f} ms")
+            if not results.empty:
+                st.pydeck_chart(hotels.hotel_deck(results, destination, search["lat"], search["lon"]))
+                st.dataframe(
+                    results[['name', 'distance_km', 'price_eur', 'rating']],
+                    hide_index=True,
+                    column_config={
+                        "name": "Hotel",
+                        "distance_km": st.column_config.NumberColumn("Distance", format="%.2f km"),
+                        "price_eur": st.column_config.NumberColumn("Price per night", format="€%d"),
+                        "rating": st.column_config.NumberColumn("Rating", format="%.1f ★"),
+                    },
+                )
         st.markdown("</div>", unsafe_allow_html=True)
 
 else:
-    # Dummy bot responses
-    responses = {
-        "hello": "Hi there! How can I assist you today?",
-        "how are you": "I'm just a bot, but I'm here to help!",
-        "help": "Sure! Let me know what you need help with.",
-        "bye": "Goodbye! Have a great day!",
-    }
+    # Questions are parsed into an intent plus train/station/date entities and answered from indexes built once per data version
+    with profiling.span("load"):
+        bot_index = station_bot.bot_index(load_train_data())
 
-    # Default response for unknown inputs
-    default_response = "I'm not sure how to respond to that. Can you rephrase?"
-
-    # Initialize session state to store conversation history
-    if "messages" not in st.session_state:
-        st.session_state["messages"] = []
+    # Conversation history, a ring buffer bounded in messages and bytes
+    store = get_session_store()
 
     # Chat interface
-    st.title("Dummy Bot")
+    st.title("Station Bot")
+    st.caption(station_bot.HELP_TEXT)
 
-    # Display chat history
-    for message in st.session_state["messages"]:
-        st.markdown(f"**{message['user']}:** {message['text']}")
+    # Chat history is filled in below, once this run's message has been answered
+    history = st.container()
 
     # Input form for user message
     with st.form(key="chat_form", clear_on_submit=True):  # Clear input after submission
@@ -572,8 +635,39 @@ else:
 
     if submitted and user_input:
         # Save user input to chat history
-        st.session_state["messages"].append({"user": "You", "text": user_input})
+        store.append("messages", {"user": "You", "text": user_input})
 
         # Generate bot response
-        response = responses.get(user_input.lower(), default_response)
-        st.session_state["messages"].append({"user": "Bot", "text": response})
+        with profiling.span("bot answer"):
+            response = station_bot.reply(user_input, bot_index)
+        store.append("messages", {"user": "Bot", "text": response})
+
+    # Display chat history
+    with history:
+        for message in store.items("messages"):
+            st.markdown(f"**{message['user']}:** {message['text']}")
+
+# Profiler panel
+profile_record = profiler.finish(tab)
+if show_profiler:
+    with st.sidebar:
+        st.subheader("Profiler")
+        st.plotly_chart(profiling.waterfall_figure(profile_record), width="stretch")
+        st.caption("p50/p95 per section, recent reruns of all sessions")
+        st.dataframe(profiling.section_stats(), hide_index=True)
+        st.caption("Shared caches and background prefetch")
+        st.json({
+            "filter cache": train_data.FILTER_CACHE.stats(),
+            "chart cache": train_charts.CHART_CACHE.stats(),
+            "prefetch": prefetch.PREFETCHER.stats(),
+        }, expanded=False)
+
+# Session memory: what every open session holds, heaviest first
+get_session_store().observe(st.session_state)
+if st.sidebar.toggle("Show session memory", key="show_session_memory"):
+    with st.sidebar:
+        st.subheader("Session memory")
+        sessions = session_store.report()
+        st.caption(f"{len(sessions)} sessions; bounded stores hold {session_store.total_bytes() / 1e6:.2f} MB "
+                   f"of the {session_store.GLOBAL_CAP_BYTES / 1e6:.0f} MB cap")
+        st.dataframe(sessions, hide_index=True)
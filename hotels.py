@@ -0,0 +1,216 @@
+"""
+Hotel search around stations for the Hotel tab.
+
+Hotels are bucketed into a fixed latitude/longitude grid. A search only
+computes haversine distances for the hotels in the grid cells its radius
+can reach, so its cost depends on how many hotels are nearby, not on the
+size of the file.
+"""
+import functools
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+HOTEL_DATA_PATH = 'data/hotels.csv'
+HOTEL_DTYPES = {
+    'hotel_id': 'int32', 'name': 'object', 'latitude': 'float64', 'longitude': 'float64',
+    'price_eur': 'int16', 'rating': 'float32',
+}
+EARTH_RADIUS_KM = 6371.0088
+# Grid cell size in degrees, about 1.1 km north-south
+CELL_DEGREES = 0.01
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from (lat, lon) to each of lats/lons, all in degrees."""
+    lat, lon, lats, lons = (np.radians(value) for value in (lat, lon, lats, lons))
+    return _central_angle_km(_haversine_term(lat, lon, lats, lons, np.cos(lats)))
+
+
+def _haversine_term(lat, lon, lats, lons, cos_lats):
+    # Radians throughout; grows with distance, so it can be compared before taking arcsin
+    return np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * cos_lats * np.sin((lons - lon) / 2) ** 2
+
+
+def _central_angle_km(term):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(term, 1.0)))
+
+
+class HotelIndex:
+    """
+    Hotels sorted by grid cell, with each occupied cell's slice of rows.
+    A cell is CELL_DEGREES of latitude by CELL_DEGREES of longitude.
+    """
+
+    def __init__(self, hotels, cell_degrees=CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._columns = int(math.ceil(360 / cell_degrees))
+        rows, columns = self._cell(hotels['latitude'].to_numpy(), hotels['longitude'].to_numpy())
+        cells = rows * self._columns + columns
+        order = np.argsort(cells, kind='stable')
+        self.hotels = hotels.iloc[order].reset_index(drop=True)
+        # Plain arrays: building a small result from them is much cheaper than DataFrame.iloc
+        self._arrays = {column: self.hotels[column].to_numpy() for column in self.hotels.columns}
+        self._lat = np.radians(self._arrays['latitude'])
+        self._lon = np.radians(self._arrays['longitude'])
+        self._cos_lat = np.cos(self._lat)
+        occupied, starts, counts = np.unique(cells[order], return_index=True, return_counts=True)
+        self._cells = dict(zip(occupied.tolist(), zip(starts.tolist(), (starts + counts).tolist())))
+
+    def _cell(self, lat, lon):
+        rows = np.floor((np.asarray(lat) + 90) / self.cell_degrees).astype(np.int64)
+        columns = np.floor((np.asarray(lon) + 180) / self.cell_degrees).astype(np.int64) % self._columns
+        return rows, columns
+
+    def _candidates(self, lat, lon, radius_km):
+        """Row positions of every hotel in the cells a radius_km circle around (lat, lon) can touch."""
+        lat_span = math.degrees(radius_km / EARTH_RADIUS_KM)
+        # Longitude degrees shrink towards the poles; past them every column is in range
+        widest = min(abs(lat) + lat_span, 90)
+        lon_span = 180 if widest >= 89.9 else min(180, lat_span / math.cos(math.radians(widest)))
+        first_row, first_column = self._cell(lat - lat_span, lon - lon_span)
+        last_row, last_column = self._cell(lat + lat_span, lon + lon_span)
+        column_count = self._columns if lon_span >= 180 else (last_column - first_column) % self._columns + 1
+        if (last_row - first_row + 1) * column_count > len(self._cells):
+            # A radius wider than the occupied grid: visiting the hotels directly is cheaper
+            return np.arange(len(self.hotels))
+        slices = []
+        for row in range(int(first_row), int(last_row) + 1):
+            for offset in range(int(column_count)):
+                cell = self._cells.get(row * self._columns + (int(first_column) + offset) % self._columns)
+                if cell is not None:
+                    slices.append(np.arange(*cell))
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def _terms(self, lat, lon, positions):
+        lat, lon = math.radians(lat), math.radians(lon)
+        return _haversine_term(lat, lon, self._lat[positions], self._lon[positions], self._cos_lat[positions])
+
+    def within(self, lat, lon, radius_km):
+        """Returns the hotels within radius_km of (lat, lon), nearest first, with a distance_km column."""
+        positions = self._candidates(lat, lon, radius_km)
+        terms = self._terms(lat, lon, positions)
+        keep = terms <= math.sin(radius_km / EARTH_RADIUS_KM / 2) ** 2
+        return self._result(positions[keep], _central_angle_km(terms[keep]))
+
+    def nearest(self, lat, lon, count):
+        """
+        Returns the count hotels nearest to (lat, lon), nearest first, with a distance_km column.
+        The search radius starts at one cell height and doubles until it holds count hotels;
+        every hotel outside it is farther than every hotel inside, so the result is exact.
+        """
+        radius_km = math.radians(self.cell_degrees) * EARTH_RADIUS_KM
+        while True:
+            positions = self._candidates(lat, lon, radius_km)
+            terms = self._terms(lat, lon, positions)
+            if len(positions) == len(self.hotels):
+                break
+            inside = terms <= math.sin(radius_km / EARTH_RADIUS_KM / 2) ** 2
+            if inside.sum() >= count:
+                positions, terms = positions[inside], terms[inside]
+                break
+            radius_km *= 2
+        if len(terms) > count:
+            top = np.argpartition(terms, count - 1)[:count]
+            positions, terms = positions[top], terms[top]
+        return self._result(positions, _central_angle_km(terms))
+
+    def _result(self, positions, distances):
+        order = np.argsort(distances, kind='stable')
+        positions = positions[order]
+        columns = {column: values[positions] for column, values in self._arrays.items()}
+        # The arrays above are fresh copies already; copying them again costs more than the search
+        return pd.DataFrame({**columns, 'distance_km': distances[order].round(2)}, copy=False)
+
+    def __len__(self):
+        return len(self.hotels)
+
+
+def load_hotels(path=HOTEL_DATA_PATH):
+    """
+    Returns the HotelIndex for the bundled hotel file.
+    Like the train data, it is only re-read when the file changes.
+    """
+    stat = os.stat(path)
+    return _read_hotels(path, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=2)
+def _read_hotels(path, mtime_ns, size):
+    return HotelIndex(pd.read_csv(path, dtype=HOTEL_DTYPES))
+
+
+def station_coordinates(frame):
+    """Returns latitude/longitude per station, indexed by station name."""
+    return frame.groupby('station', observed=True)[['latitude', 'longitude']].first()
+
+
+def hotel_deck(results, station, lat, lon):
+    """Returns a pydeck Deck with the station in red and each hotel of results in blue."""
+    hotels = results.assign(label=results['name'], detail=(
+        '€' + results['price_eur'].astype(str) + ' per night, rated ' + results['rating'].map('{:.1f}'.format)
+        + ', ' + results['distance_km'].astype(str) + ' km away'
+    ))
+    points = pd.concat([
+        pd.DataFrame({'latitude': [lat], 'longitude': [lon], 'label': [station], 'detail': ['Station'],
+                      'r': [200], 'g': [30], 'b': [30], 'size': [9]}),
+        hotels[['latitude', 'longitude', 'label', 'detail']].assign(r=0, g=94, b=153, size=6),
+    ], ignore_index=True)
+    layer = pdk.Layer(
+        'ScatterplotLayer',
+        data=points,
+        get_position='[longitude, latitude]',
+        get_fill_color='[r, g, b, 200]',
+        get_radius='size',
+        radius_units='pixels',
+        pickable=True,
+    )
+    view_state = pdk.ViewState(latitude=lat, longitude=lon, zoom=13)
+    return pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip={'html': '<b>{label}</b><br>{detail}'}, map_style='light')
+
+
+# Parts of the generated hotel names
+_NAME_PREFIXES = ['Grand', 'Park', 'Central', 'City', 'Station', 'Royal', 'Garden', 'Riverside', 'Old Town', 'Boutique']
+_NAME_SUFFIXES = ['Hotel', 'Inn', 'Suites', 'Residence', 'Lodge', 'Apartments']
+
+
+def sample_hotels(centres, count, seed=0):
+    """
+    Returns count synthetic hotels scattered around centres, a frame of
+    latitude/longitude indexed by place name: most within a few km, a few
+    farther out. Used to build the bundled sample file and large benchmark sets.
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(centres), count)
+    distance_km = rng.exponential(2.0, count)
+    bearing = rng.uniform(0, 2 * np.pi, count)
+    centre_lat = centres['latitude'].to_numpy()[picks]
+    lat = centre_lat + np.degrees(distance_km * np.cos(bearing) / EARTH_RADIUS_KM)
+    lon = centres['longitude'].to_numpy()[picks] + np.degrees(
+        distance_km * np.sin(bearing) / (EARTH_RADIUS_KM * np.cos(np.radians(centre_lat)))
+    )
+    place = pd.Series(centres.index.to_numpy()[picks]).str.split(r'[ \-/(]').str[0]
+    name = (
+        pd.Series(np.array(_NAME_PREFIXES)[rng.integers(0, len(_NAME_PREFIXES), count)]) + ' ' + place + ' '
+        + pd.Series(np.array(_NAME_SUFFIXES)[rng.integers(0, len(_NAME_SUFFIXES), count)])
+    )
+    return pd.DataFrame({
+        'hotel_id': np.arange(1, count + 1, dtype=np.int32),
+        'name': name,
+        'latitude': lat.round(6),
+        'longitude': lon.round(6),
+        # Closer to the station tends to cost more
+        'price_eur': (rng.lognormal(4.6, 0.4, count) * (1.3 - 0.05 * np.minimum(distance_km, 6))).round().astype(np.int16),
+        'rating': np.clip(rng.normal(4.0, 0.5, count), 1.0, 5.0).round(1).astype(np.float32),
+    })
+
+
+if __name__ == '__main__':
+    import train_data
+    # Rebuilds the bundled sample: 100 synthetic hotels per station
+    stations = station_coordinates(train_data.load_dataset(columns=['station', 'scheduled_dt', 'latitude', 'longitude']).frame)
+    sample_hotels(stations, 100 * len(stations), seed=2024).to_csv(HOTEL_DATA_PATH, index=False)
+    print(HOTEL_DATA_PATH)
@@ -0,0 +1,52 @@
+"""
+Figures for the Passenger tab. Each takes the same wide frame, hr plus
+train_data.PASSENGER_COLUMNS summed per hour, and reads its own columns.
+"""
+import plotly.graph_objects as go
+
+import train_data
+
+
+def nationality_figure(hourly):
+    """Donut of EU vs non-EU passengers over the selected hours."""
+    totals = hourly[train_data.NATIONALITY_COLUMNS].sum()
+    fig = go.Figure(go.Pie(labels=totals.index, values=totals.to_numpy(), hole=0.4))
+    fig.update_layout(title='Distribution of EU vs Non-EU Count', legend_title_text='category')
+    return fig
+
+
+def meal_figure(hourly):
+    """Meals stacked per hour, one bar trace per meal column, with total passengers as a line."""
+    fig = go.Figure()
+    for column in train_data.MEAL_COLUMNS:
+        fig.add_bar(x=hourly['hr'], y=hourly[column], name=column, texttemplate='%{y}')
+    fig.add_scatter(
+        x=hourly['hr'],
+        y=hourly['passeneger_counts'],
+        mode='lines+markers',
+        name='Total Passengers',
+        line=dict(color='black', width=2, dash='dash'),
+    )
+    fig.update_layout(
+        barmode='relative',
+        title='Passenger Counts with Meal Distribution',
+        xaxis_title='Hour',
+        yaxis_title='Meal Count',
+        legend_title_text='meal_type',
+    )
+    return fig
+
+
+def age_figure(hourly):
+    """Grouped bars of each age band per hour."""
+    fig = go.Figure()
+    for column in train_data.AGE_COLUMNS:
+        fig.add_bar(x=hourly['hr'], y=hourly[column], name=column)
+    fig.update_layout(
+        barmode='group',
+        title='Pax Age Group By Hour',
+        xaxis_title='Hour',
+        yaxis_title='Count',
+        legend_title_text='Range',
+    )
+    return fig
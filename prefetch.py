@@ -0,0 +1,107 @@
+"""
+Speculative warming of the shared caches for the selections a user is likely
+to pick next: the neighbouring dates and stations of the one just served.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+# Background threads shared by every session
+MAX_WORKERS = 2
+# Selections warmed after each served view; more would start evicting views people are using
+BUDGET_PER_VIEW = 6
+# Tasks waiting or running across all sessions, beyond which new ones are dropped
+MAX_PENDING = 24
+
+
+def adjacent_selections(stations, station, travel_date, min_date, max_date):
+    """
+    Returns the (station, date) pairs most likely to be picked next, most likely first:
+    the next and previous dates, then the other stations by distance in the station list.
+    """
+    selections = [
+        (station, day) for day in (travel_date + timedelta(days=1), travel_date - timedelta(days=1))
+        if min_date <= day <= max_date
+    ]
+    position = stations.index(station) if station in stations else 0
+    for distance in range(1, len(stations)):
+        for neighbour in (position + distance, position - distance):
+            if 0 <= neighbour < len(stations):
+                selections.append((stations[neighbour], travel_date))
+    return selections
+
+
+class Prefetcher:
+    """
+    Runs warm-up tasks on a small thread pool. Each owner (a browser session)
+    has at most one batch in flight: scheduling a new batch cancels whatever
+    of the previous one has not started, since the user has moved on. A batch
+    is forgotten once all of it has finished, so owners that leave cost nothing.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, budget=BUDGET_PER_VIEW, max_pending=MAX_PENDING):
+        self.budget = budget
+        self.max_pending = max_pending
+        self.completed = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._batches = {}
+        self._in_flight = {}
+        # Re-entrant: cancel() and add_done_callback() on a finished future call _finished() right away
+        self._lock = threading.RLock()
+
+    def schedule(self, owner, tasks):
+        """
+        Queues up to budget of tasks, (key, warm) pairs in priority order, for owner.
+        warm() fills a shared cache and must not touch Streamlit; a key already
+        queued or running, by any owner, is not queued twice.
+        """
+        with self._lock:
+            for future in self._batches.pop(owner, []):
+                if future.cancel():
+                    self.cancelled += 1
+            batch = []
+            for key, warm in tasks[:self.budget]:
+                if key in self._in_flight:
+                    continue
+                if len(self._in_flight) >= self.max_pending:
+                    self.dropped += 1
+                    continue
+                future = self._executor.submit(warm)
+                self._in_flight[key] = future
+                future.add_done_callback(lambda future, key=key: self._finished(owner, key, future))
+                batch.append(future)
+            # Tasks may already have finished, and an empty batch has nothing to cancel
+            if not all(future.done() for future in batch):
+                self._batches[owner] = batch
+
+    def _finished(self, owner, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            batch = self._batches.get(owner)
+            if batch is not None and all(other.done() for other in batch):
+                del self._batches[owner]
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                # A failed warm-up only costs the user the cache hit; the real request reports the error
+                self.failed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._in_flight),
+                'sessions': len(self._batches),
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
+
+
+PREFETCHER = Prefetcher()
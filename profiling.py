@@ -0,0 +1,146 @@
+"""Lightweight timing spans for hackthon_app.py reruns."""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+import plotly.graph_objects as go
+
+# Rolling JSON-lines log of every rerun's spans, shared by all sessions
+PROFILE_LOG_PATH = 'profile_log.jsonl'
+# The log is rotated to PROFILE_LOG_PATH + '.1' once it grows past this size
+PROFILE_LOG_MAX_BYTES = 5_000_000
+# Reruns kept in memory for the p50/p95 table
+HISTORY_SIZE = 2000
+
+_current = contextvars.ContextVar('profiler', default=None)
+_history = deque(maxlen=HISTORY_SIZE)
+_log_lock = threading.Lock()
+
+
+class Profiler:
+    """Records the spans of one script rerun; span() calls anywhere in the rerun's thread report here."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._depth = 0
+        _current.set(self)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append({
+                'name': name,
+                'start_ms': (start - self.started) * 1000,
+                'duration_ms': (time.perf_counter() - start) * 1000,
+                'depth': self._depth,
+            })
+
+    def finish(self, label):
+        """Stops recording, logs the rerun under label and returns its record."""
+        _current.set(None)
+        record = {
+            'time': time.time(),
+            'label': label,
+            'total_ms': (time.perf_counter() - self.started) * 1000,
+            'spans': sorted(self.spans, key=lambda span: span['start_ms']),
+        }
+        _history.append(record)
+        _append_log(record)
+        return record
+
+
+@contextlib.contextmanager
+def span(name):
+    """Times the enclosed block on the current rerun's Profiler, if there is one."""
+    profiler = _current.get()
+    if profiler is None:
+        yield
+    else:
+        with profiler.span(name):
+            yield
+
+
+@contextlib.contextmanager
+def fragment_rerun(label):
+    """
+    Profiles a fragment rerun as a rerun of its own under label.
+    During a full rerun the fragment's spans join that rerun's Profiler instead.
+    """
+    if _current.get() is not None:
+        yield
+    else:
+        profiler = Profiler()
+        try:
+            yield
+        finally:
+            profiler.finish(label)
+
+
+def _append_log(record):
+    with _log_lock:
+        if os.path.exists(PROFILE_LOG_PATH) and os.path.getsize(PROFILE_LOG_PATH) > PROFILE_LOG_MAX_BYTES:
+            os.replace(PROFILE_LOG_PATH, PROFILE_LOG_PATH + '.1')
+        with open(PROFILE_LOG_PATH, 'a') as log_file:
+            log_file.write(json.dumps(record) + '\n')
+
+
+def _load_history():
+    if not os.path.exists(PROFILE_LOG_PATH):
+        return
+    with open(PROFILE_LOG_PATH) as log_file:
+        for line in deque(log_file, maxlen=HISTORY_SIZE):
+            try:
+                _history.append(json.loads(line))
+            except ValueError:
+                # A line cut short by a crash mid-write
+                continue
+
+
+def section_stats():
+    """Returns count, p50 and p95 duration per (tab, section) over the recent reruns of every session."""
+    rows = [
+        {'tab': record['label'], 'section': span['name'], 'duration_ms': span['duration_ms']}
+        for record in list(_history) for span in record['spans']
+    ]
+    if not rows:
+        return pd.DataFrame(columns=['tab', 'section', 'count', 'p50_ms', 'p95_ms'])
+    durations = pd.DataFrame(rows).groupby(['tab', 'section'])['duration_ms']
+    return pd.DataFrame({
+        'count': durations.count(),
+        'p50_ms': durations.quantile(0.5).round(1),
+        'p95_ms': durations.quantile(0.95).round(1),
+    }).reset_index()
+
+
+def waterfall_figure(record):
+    """Horizontal bars, one per span, placed at their offset from the start of the rerun."""
+    spans = record['spans']
+    fig = go.Figure(go.Bar(
+        y=[' ' * span['depth'] + span['name'] for span in spans],
+        x=[span['duration_ms'] for span in spans],
+        base=[span['start_ms'] for span in spans],
+        orientation='h',
+        hovertemplate='%{y}: %{x:.1f} ms<extra></extra>',
+    ))
+    fig.update_layout(
+        title=f"{record['label']} rerun: {record['total_ms']:.0f} ms",
+        xaxis_title='ms since rerun start',
+        yaxis={'autorange': 'reversed'},
+        height=max(250, 28 * len(spans) + 100),
+        margin={'l': 10, 'r': 10, 't': 40, 'b': 10},
+    )
+    return fig
+
+
+_load_history()
@@ -0,0 +1,221 @@
+"""
+Query backends for the dashboard filters and hourly sums.
+
+PandasBackend answers from the frame, StationDateHourIndex and HourlyCube
+held in memory. SqliteBackend pushes the same station/date/hour filter and
+the per-hour GROUP BY down to a SQLite copy of the columnar file, indexed on
+(station, scheduled_dt, hr), so only the rows and sums the charts need are
+brought into pandas and the full frame is never loaded. Both return the same
+rows in the same order, so the app can switch between them to compare.
+"""
+import contextlib
+import dataclasses
+import functools
+import os
+import sqlite3
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+
+import train_data
+
+BACKENDS = ['pandas', 'SQLite']
+SQLITE_SUFFIX = '.sqlite'
+TABLE = 'trains'
+
+
+class PandasBackend:
+    """The in-memory path: a TrainDataset for the rows and a HourlyCube for the sums."""
+    name = 'pandas'
+
+    def __init__(self, dataset, hourly):
+        self.dataset = dataset
+        self.hourly = hourly
+        self.stations = dataset.stations
+        self.min_date = dataset.min_date
+        self.max_date = dataset.max_date
+        self.version = dataset.version
+        self.column_names = dataset.column_names
+
+    def filter(self, station, travel_date, start_hour, end_hour):
+        return self.dataset.filter(station, travel_date, start_hour, end_hour)
+
+    def view(self, station, travel_date, start_hour, end_hour):
+        return train_data.filtered_view(self.dataset, station, travel_date, start_hour, end_hour)
+
+    def hourly_sums(self, station, travel_date, start_hour, end_hour, columns):
+        return self.hourly.sums(station, travel_date, start_hour, end_hour, columns)
+
+
+@dataclass(frozen=True)
+class SqliteBackend:
+    """
+    A SQLite database built from the columnar file, plus the widget metadata
+    read from it once. Each thread queries through its own read-only connection.
+    """
+    database: str
+    stations: list
+    min_date: date
+    max_date: date
+    # (mtime_ns, size) of the source CSV, as TrainDataset.version
+    version: tuple
+    column_names: tuple
+    name = 'SQLite'
+
+    def restricted(self, columns):
+        """Returns this backend with filter() yielding only columns."""
+        return dataclasses.replace(self, column_names=tuple(columns))
+
+    def filter(self, station, travel_date, start_hour, end_hour):
+        """Returns the rows for station on travel_date with start_hour <= hr < end_hour, in file order."""
+        # rowid follows the columnar file, so ordering by it gives the pandas row order
+        sql = (
+            f'SELECT {_column_list(self.column_names)} FROM {TABLE} '
+            'WHERE station = ? AND scheduled_dt = ? AND hr >= ? AND hr < ? ORDER BY rowid'
+        )
+        names, values = self._fetch(sql, (station, travel_date.isoformat(), start_hour, end_hour))
+        columns = list(zip(*values)) if values else [()] * len(names)
+        # SQLite only has TEXT, INTEGER and REAL; each column is built with the dtype ingest gave it,
+        # which is much cheaper than DataFrame.astype() on a frame this wide
+        rows = {}
+        for name, column in zip(names, columns):
+            if name == 'scheduled_dt':
+                # Every row matched scheduled_dt = travel_date
+                rows[name] = np.full(len(column), travel_date, dtype=object)
+            elif name in train_data.CATEGORICAL_COLUMNS:
+                rows[name] = pd.Categorical(column)
+            elif name in train_data.COORDINATE_COLUMNS or name in train_data.DELAY_COLUMNS:
+                # NULL, an unrecorded delay, becomes NaN
+                rows[name] = np.array(column, dtype=np.float32)
+            else:
+                rows[name] = np.array(column, dtype=np.int64)
+        return pd.DataFrame(rows, columns=names, copy=False)
+
+    def view(self, station, travel_date, start_hour, end_hour):
+        key = (self.name, self.version, self.column_names, station, travel_date, start_hour, end_hour)
+        return train_data.FILTER_CACHE.get_or_compute(
+            key, lambda: train_data.FilteredView(self.filter(station, travel_date, start_hour, end_hour)),
+        )
+
+    def hourly_sums(self, station, travel_date, start_hour, end_hour, columns):
+        """Same result as HourlyCube.sums(): hr plus the summed columns, one row per hour present."""
+        sums = ', '.join(f'SUM({_quote(col)}) AS {_quote(col)}' for col in columns)
+        sql = (
+            f'SELECT hr, {sums} FROM {TABLE} '
+            'WHERE station = ? AND scheduled_dt = ? AND hr >= ? AND hr < ? GROUP BY hr ORDER BY hr'
+        )
+        return self._query(sql, (station, travel_date.isoformat(), start_hour, end_hour))
+
+    def _query(self, sql, params):
+        names, values = self._fetch(sql, params)
+        return pd.DataFrame.from_records(values, columns=names)
+
+    def _fetch(self, sql, params):
+        cursor = _connection(self.database, self.version).execute(sql, params)
+        return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def sqlite_backend(path=train_data.TRAIN_DATA_PATH, columns=None):
+    """
+    Returns the SqliteBackend for the CSV at path, building the database on first
+    use and whenever the CSV changes; filter() yields only columns when given.
+    """
+    stat = os.stat(path)
+    backend = _open_database(path, stat.st_mtime_ns, stat.st_size)
+    return backend if columns is None else backend.restricted(columns)
+
+
+def sqlite_path(path):
+    return os.path.splitext(path)[0] + SQLITE_SUFFIX
+
+
+@functools.lru_cache(maxsize=1)
+def _open_database(path, mtime_ns, size):
+    database = sqlite_path(path)
+    version = (mtime_ns, size)
+    # Outside the lock: ingest() takes it too when it rebuilds the columnar copy
+    columnar = train_data.ingest(path)
+    with train_data.rebuild_lock(path):
+        # Checked under the lock, so only one thread or process builds a given version
+        if _stamp(database) != (*version, train_data.INGEST_SCHEMA_VERSION):
+            _write_database(columnar, database, version)
+    connection = _connection(database, version)
+    # Stations in order of first appearance, like TrainDataset.stations
+    stations = [row[0] for row in connection.execute(
+        f'SELECT station FROM {TABLE} GROUP BY station ORDER BY MIN(rowid)'
+    )]
+    min_date, max_date = connection.execute(f'SELECT MIN(scheduled_dt), MAX(scheduled_dt) FROM {TABLE}').fetchone()
+    column_names = tuple(row[1] for row in connection.execute(f'PRAGMA table_info({TABLE})'))
+    return SqliteBackend(
+        database=database,
+        stations=stations,
+        min_date=date.fromisoformat(min_date),
+        max_date=date.fromisoformat(max_date),
+        version=version,
+        column_names=column_names,
+    )
+
+
+def _stamp(database):
+    if not os.path.exists(database):
+        return None
+    # closing(): a sqlite3 connection's own context manager commits but does not close
+    with contextlib.closing(sqlite3.connect(f'file:{database}?mode=ro', uri=True)) as connection:
+        try:
+            row = connection.execute('SELECT mtime_ns, size, ingest_schema FROM source').fetchone()
+        except sqlite3.DatabaseError:
+            return None
+    return tuple(row) if row else None
+
+
+def _write_database(columnar, database, version):
+    # Read from the columnar copy (already parsed and compacted) and dropped once written
+    frame = feather.read_table(columnar).to_pandas()
+    frame['scheduled_dt'] = frame['scheduled_dt'].map(date.isoformat)
+    # Built under a name unique to this call and moved into place, so open connections keep reading the old file
+    handle, tmp_path = tempfile.mkstemp(prefix=os.path.basename(database) + '.', suffix='.tmp', dir=os.path.dirname(database) or '.')
+    os.close(handle)
+    try:
+        connection = sqlite3.connect(tmp_path)
+        try:
+            frame.to_sql(TABLE, connection, index=False)
+            connection.execute(f'CREATE INDEX {TABLE}_station_date_hr ON {TABLE} (station, scheduled_dt, hr)')
+            connection.execute('CREATE TABLE source (mtime_ns INTEGER, size INTEGER, ingest_schema INTEGER)')
+            connection.execute('INSERT INTO source VALUES (?, ?, ?)', (*version, train_data.INGEST_SCHEMA_VERSION))
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(tmp_path, database)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+_local = threading.local()
+
+
+def _connection(database, version):
+    # sqlite3 connections belong to the thread that opened them; one per thread and database version
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = (database, version)
+    if key not in connections:
+        for stale in [other for other in connections if other[0] == database]:
+            connections.pop(stale).close()
+        connections[key] = sqlite3.connect(f'file:{database}?mode=ro', uri=True)
+    return connections[key]
+
+
+def _quote(name):
+    # Age band columns are named like '00~02' and '100+'
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_list(columns):
+    return ', '.join(_quote(col) for col in columns)
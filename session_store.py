@@ -0,0 +1,207 @@
+"""
+Bounded, measured per-session storage for hackthon_app.py.
+
+What a session keeps across reruns goes into its SessionStore rather than
+straight into st.session_state. Every key has a Budget: 'ring' keys hold a
+sequence and drop their oldest items (chat history), 'lru' keys hold a
+mapping and drop their least recently used entries (search results). All
+stores in the process also share GLOBAL_CAP_BYTES; past it, the session
+holding the most loses its oldest items first, so one heavy session cannot
+push the server into swap.
+"""
+import sys
+import threading
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Bytes every session's stores may hold together
+GLOBAL_CAP_BYTES = 64_000_000
+
+
+@dataclass(frozen=True)
+class Budget:
+    """How much one key of a store may hold, and what it drops first."""
+    # 'ring' (oldest item first) or 'lru' (least recently used entry first)
+    policy: str
+    max_bytes: int
+    max_items: int = None
+
+
+def estimate_bytes(value):
+    """Approximate resident size of value, following containers and counting frames deeply."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(key) + estimate_bytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset, deque)):
+        return sys.getsizeof(value) + sum(estimate_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class SessionStore:
+    """
+    The bounded values of one session. Each item's size is measured once,
+    when it is stored, so usage is known without walking the values again.
+    """
+
+    def __init__(self, session_id, budgets):
+        self.session_id = session_id
+        self.budgets = dict(budgets)
+        self.evictions = 0
+        self.rejected = 0
+        # Estimated size of the rest of the session's st.session_state, see observe()
+        self.other_state_bytes = 0
+        self._items = {key: deque() if budget.policy == 'ring' else OrderedDict() for key, budget in self.budgets.items()}
+        # Size of each stored item, kept alongside _items, per key
+        self._sizes = {key: deque() if budget.policy == 'ring' else {} for key, budget in self.budgets.items()}
+        self._bytes = dict.fromkeys(self.budgets, 0)
+        self._lock = threading.Lock()
+        _register(self)
+
+    def append(self, key, item):
+        """Adds item to the end of ring key, dropping the oldest items past its budget."""
+        size = estimate_bytes(item)
+        with self._lock:
+            if not self._admit(key, size):
+                return
+            self._items[key].append(item)
+            self._sizes[key].append(size)
+            self._bytes[key] += size
+            self._trim(key)
+        _enforce_global_cap()
+
+    def items(self, key):
+        """The items of ring key, oldest first."""
+        with self._lock:
+            return list(self._items[key])
+
+    def put(self, key, name, value):
+        """Stores value under name in lru key, dropping the least recently used entries past its budget."""
+        size = estimate_bytes(value)
+        with self._lock:
+            if not self._admit(key, size):
+                return
+            entries, sizes = self._items[key], self._sizes[key]
+            if name in entries:
+                self._bytes[key] -= sizes[name]
+            entries[name] = value
+            entries.move_to_end(name)
+            sizes[name] = size
+            self._bytes[key] += size
+            self._trim(key)
+        _enforce_global_cap()
+
+    def get(self, key, name):
+        """The value under name in lru key, or None; marks it most recently used."""
+        with self._lock:
+            entries = self._items[key]
+            if name not in entries:
+                return None
+            entries.move_to_end(name)
+            return entries[name]
+
+    def _admit(self, key, size):
+        # An item bigger than the key's whole budget would only evict everything and then itself
+        if size > self.budgets[key].max_bytes:
+            self.rejected += 1
+            return False
+        return True
+
+    def _trim(self, key):
+        budget = self.budgets[key]
+        while self._bytes[key] > budget.max_bytes or (budget.max_items is not None and len(self._items[key]) > budget.max_items):
+            self._evict_oldest(key)
+
+    def _evict_oldest(self, key):
+        if self.budgets[key].policy == 'ring':
+            self._items[key].popleft()
+            self._bytes[key] -= self._sizes[key].popleft()
+        else:
+            name, _ = self._items[key].popitem(last=False)
+            self._bytes[key] -= self._sizes[key].pop(name)
+        self.evictions += 1
+
+    def shed(self):
+        """Drops the oldest item of the key holding the most bytes. Returns False when empty."""
+        with self._lock:
+            key = max(self._bytes, key=self._bytes.get, default=None)
+            if key is None or not self._items[key]:
+                return False
+            self._evict_oldest(key)
+            return True
+
+    def observe(self, session_state):
+        """Records the estimated size of everything else the session keeps in session_state."""
+        self.other_state_bytes = sum(
+            estimate_bytes(value) for value in session_state.values() if value is not self
+        )
+
+    @property
+    def total_bytes(self):
+        return sum(self._bytes.values())
+
+    def usage(self):
+        """Items, bytes and budget per key."""
+        with self._lock:
+            return {
+                key: {'items': len(self._items[key]), 'bytes': self._bytes[key], 'max_bytes': budget.max_bytes}
+                for key, budget in self.budgets.items()
+            }
+
+
+# Every live session's store; a store goes away with its session's state
+_STORES = weakref.WeakValueDictionary()
+_STORES_LOCK = threading.Lock()
+
+
+def _register(store):
+    with _STORES_LOCK:
+        _STORES[store.session_id] = store
+
+
+def _enforce_global_cap(cap=None):
+    cap = GLOBAL_CAP_BYTES if cap is None else cap
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+        total = sum(store.total_bytes for store in stores)
+        while total > cap and stores:
+            heaviest = max(stores, key=lambda store: store.total_bytes)
+            before = heaviest.total_bytes
+            if not heaviest.shed():
+                stores.remove(heaviest)
+                continue
+            total -= before - heaviest.total_bytes
+
+
+def report():
+    """One row per live session: bytes per key, other session state, total and evictions, heaviest first."""
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+    rows = []
+    for store in stores:
+        usage = store.usage()
+        rows.append({
+            'session': store.session_id[:8],
+            **{f'{key} (bytes)': entry['bytes'] for key, entry in usage.items()},
+            'other state (bytes)': store.other_state_bytes,
+            'total (bytes)': store.total_bytes + store.other_state_bytes,
+            'evictions': store.evictions,
+            'rejected': store.rejected,
+        })
+    if not rows:
+        return pd.DataFrame(columns=['session', 'total (bytes)'])
+    return pd.DataFrame(rows).sort_values('total (bytes)', ascending=False)
+
+
+def total_bytes():
+    """Bytes held by every live session's store, the figure GLOBAL_CAP_BYTES bounds."""
+    with _STORES_LOCK:
+        return sum(store.total_bytes for store in _STORES.values())
@@ -0,0 +1,299 @@
+"""
+Question answering for the Station Bot tab.
+
+A message is parsed into a Query (intent plus train, station, date and
+metric entities) by keyword and pattern matching, then answered from a
+BotIndex precomputed once per dataset version, so no answer scans the frame.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from caching import LruCache
+from train_data import DELAY_COLUMNS, HOURLY_SUM_COLUMNS
+
+# Messages kept in a session's chat history, oldest dropped first
+CHAT_HISTORY_SIZE = 50
+# Bytes of chat history a session may keep, however long its messages
+CHAT_HISTORY_BYTES = 256_000
+
+# Small talk answered before any parsing
+SMALL_TALK = {
+    "hello": "Hi there! How can I assist you today?",
+    "how are you": "I'm just a bot, but I'm here to help!",
+    "bye": "Goodbye! Have a great day!",
+}
+HELP_TEXT = (
+    "Ask me about the trains in the data, for example: "
+    "\"average delay at Paris Gare du Nord on 2024-12-30\", "
+    "\"wheelchair passengers on train 9004\" or \"busiest hour at St Pancras\"."
+)
+DEFAULT_RESPONSE = "I'm not sure how to respond to that. Can you rephrase? Type \"help\" for examples."
+
+# (phrases, column, label) of each countable metric; the first listed match wins,
+# so specific phrases come before the words they contain
+METRICS = [
+    (('wheelchair companion', 'companion'), 'wheelchair_companion', 'wheelchair companions'),
+    (('wheelchair',), 'wheelchair', 'wheelchair passengers'),
+    (('guide dog',), 'guide_dog', 'guide dogs'),
+    (('non-eu', 'non eu', 'noneu'), 'noneu_count', 'non-EU passengers'),
+    (('eu',), 'eu_count', 'EU passengers'),
+    (('child meal', 'children meal', "children's meal"), 'child_meal', 'child meals'),
+    (('dairy free', 'dairy-free'), 'dairy_free_meal', 'dairy-free meals'),
+    (('diabetic',), 'diabetic_meal', 'diabetic meals'),
+    (('gluten free', 'gluten-free'), 'gluten_free_meal', 'gluten-free meals'),
+    (('kosher',), 'kosher_meal', 'kosher meals'),
+    (('low fat', 'low-fat'), 'low_fat_meal', 'low-fat meals'),
+    (('low salt', 'low-salt'), 'low_salt_meal', 'low-salt meals'),
+    (('halal',), 'halal_meal', 'halal meals'),
+    (('vegan',), 'vegan_meal', 'vegan meals'),
+    (('vegetarian',), 'vegetarian_meal', 'vegetarian meals'),
+    (('standard meal',), 'standard_meal', 'standard meals'),
+    (('meal',), None, 'meals'),
+    (('senior',), 'senior', 'seniors'),
+    (('adult',), 'adult', 'adults'),
+    (('youth',), 'youth', 'youths'),
+    (('child', 'children', 'kid'), 'child', 'children'),
+    (('premier',), 'premier', 'Premier passengers'),
+    (('plus',), 'plus', 'Plus passengers'),
+    (('standard',), 'standard', 'Standard passengers'),
+    (('group',), 'group', 'group passengers'),
+    (('assistance',), 'assistance', 'passengers needing assistance'),
+    (('duty',), 'duty', 'duty passengers'),
+    (('passenger', 'pax', 'people', 'traveller', 'traveler'), 'passeneger_counts', 'passengers'),
+]
+MEAL_METRIC = [column for column in HOURLY_SUM_COLUMNS if column.endswith('_meal')]
+_METRIC_PATTERNS = [
+    (re.compile(r'\b(?:' + '|'.join(re.escape(phrase) for phrase in phrases) + r')s?\b'), column, label)
+    for phrases, column, label in METRICS
+]
+_DELAY_PATTERN = re.compile(r'\b(?:delay|delayed|late|lateness|punctual|punctuality|on time)s?\b')
+_BUSIEST_PATTERN = re.compile(r'\b(?:busiest|busy|peak|rush|crowded)\b')
+_ISO_DATE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_DMY_DATE = re.compile(r'\b(\d{1,2})/(\d{1,2})/(\d{4})\b')
+_TRAIN_NO = re.compile(r'\btrain\s*(?:no\.?|number|#)?\s*(\d+)\b')
+_NUMBER = re.compile(r'\b(\d{3,5})\b')
+_WORD = re.compile(r"[^\W_]+")
+
+
+@dataclass(frozen=True)
+class Query:
+    """What a message asks for; entities the message did not name are None."""
+    intent: str
+    train_no: int = None
+    station: str = None
+    travel_date: date = None
+    # HOURLY_SUM_COLUMNS entry counted by a 'count' query, None for all meals
+    column: str = None
+    label: str = None
+
+
+class BotIndex:
+    """
+    Lookup tables built once per dataset version:
+      - row positions of each train_no
+      - per (station, date) sums of every count column and the departures, plus
+        the sum and number of the recorded delays (ingest keeps the others missing)
+      - per (station, date, hr) passenger totals
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.trains = frame.groupby('train_no', sort=False).indices
+        daily = frame.groupby(['station', 'scheduled_dt'], observed=True)
+        self.daily = daily[HOURLY_SUM_COLUMNS + DELAY_COLUMNS].sum()
+        for col in DELAY_COLUMNS:
+            self.daily[f'{col}_recorded'] = daily[col].count()
+        self.daily['departures'] = daily.size()
+        self.hourly = frame.groupby(['station', 'scheduled_dt', 'hr'], observed=True)['passeneger_counts'].sum()
+        self.stations = list(frame['station'].cat.categories)
+        self.dates = sorted(frame['scheduled_dt'].unique())
+        self._station_words = {station: set(_words(station)) for station in self.stations}
+        # Words shared by many station names ('hbf', 'airport') say less about which one is meant
+        document_frequency = Counter(word for words in self._station_words.values() for word in words)
+        self._word_weight = {word: 1 / count for word, count in document_frequency.items()}
+
+    def match_station(self, text):
+        """Returns the station whose name shares the most distinctive words with text, if any."""
+        words = set(_words(text))
+        best, best_score = None, 0
+        for station, station_words in self._station_words.items():
+            matched = station_words & words
+            # Short words ('st', 'du', 'la') only count alongside a real name word
+            if not any(len(word) >= 4 for word in matched):
+                continue
+            score = sum(self._word_weight[word] for word in matched)
+            if score > best_score:
+                best, best_score = station, score
+        return best
+
+    def scope(self, table, station, travel_date):
+        """Rows of a (station, date, ...) indexed table restricted to station and/or date."""
+        mask = np.ones(len(table), dtype=bool)
+        if station is not None:
+            mask &= table.index.get_level_values('station') == station
+        if travel_date is not None:
+            mask &= table.index.get_level_values('scheduled_dt') == travel_date
+        return table[mask]
+
+
+# Bot indexes keyed on (data version, columns)
+INDEX_CACHE = LruCache(maxsize=4)
+
+
+def bot_index(dataset):
+    """Returns the BotIndex for a TrainDataset holding every column, built on first use."""
+    key = (dataset.version, dataset.column_names)
+    return INDEX_CACHE.get_or_compute(key, lambda: BotIndex(dataset.frame))
+
+
+def _words(text):
+    return _WORD.findall(text.lower())
+
+
+def parse(text, index):
+    """Returns the Query for a message."""
+    text = text.lower().strip()
+    travel_date = None
+    for pattern, order in ((_ISO_DATE, (0, 1, 2)), (_DMY_DATE, (2, 1, 0))):
+        found = pattern.search(text)
+        if found:
+            year, month, day = (int(found.group(i + 1)) for i in order)
+            try:
+                travel_date = date(year, month, day)
+            except ValueError:
+                pass
+            text = text[:found.start()] + ' ' + text[found.end():]
+            break
+    train_no = None
+    named = _TRAIN_NO.search(text)
+    found = named or _NUMBER.search(text)
+    if found and int(found.group(1)) in index.trains:
+        train_no = int(found.group(1))
+    elif named:
+        return Query('no such train', int(named.group(1)))
+    station = index.match_station(text)
+    column, label = None, None
+    for pattern, metric_column, metric_label in _METRIC_PATTERNS:
+        if pattern.search(text):
+            column, label = metric_column, metric_label
+            break
+    if _DELAY_PATTERN.search(text):
+        intent = 'delay'
+    elif _BUSIEST_PATTERN.search(text):
+        intent = 'busiest'
+    elif label is not None:
+        intent = 'count'
+    elif train_no is not None:
+        intent = 'train'
+    elif text.rstrip('?!. ') in ('help', 'what can you do'):
+        intent = 'help'
+    elif station is not None or travel_date is not None:
+        # A bare place or day gets its passenger total
+        intent, column, label = 'count', 'passeneger_counts', 'passengers'
+    else:
+        intent = 'unknown'
+    return Query(intent, train_no, station, travel_date, column, label)
+
+
+def reply(text, index):
+    """Returns the bot's answer to a message."""
+    small_talk = SMALL_TALK.get(text.lower().strip(' ?!.'))
+    if small_talk is not None:
+        return small_talk
+    query = parse(text, index)
+    if query.intent == 'help':
+        return HELP_TEXT
+    if query.intent == 'unknown':
+        return DEFAULT_RESPONSE
+    if query.intent == 'no such train':
+        return f"There is no train {query.train_no} in the data."
+    if query.travel_date is not None and query.travel_date not in index.dates:
+        return f"I only have data from {index.dates[0]} to {index.dates[-1]}, nothing for {query.travel_date}."
+    if query.train_no is not None:
+        return _train_answer(query, index)
+    return {'delay': _delay_answer, 'busiest': _busiest_answer, 'count': _count_answer}[query.intent](query, index)
+
+
+def _sentence(label):
+    # str.capitalize() would also lower the rest, turning 'EU' into 'Eu'
+    return label[:1].upper() + label[1:]
+
+
+def _scope_text(query, with_train=True):
+    parts = []
+    if with_train and query.train_no is not None:
+        parts.append(f"train {query.train_no}")
+    if query.station is not None:
+        parts.append(f"at {query.station}")
+    parts.append(f"on {query.travel_date}" if query.travel_date is not None else "across all dates")
+    return ' '.join(parts)
+
+
+def _train_answer(query, index):
+    rows = index.frame.iloc[index.trains[query.train_no]]
+    if query.station is not None:
+        rows = rows[rows['station'] == query.station]
+    if query.travel_date is not None:
+        rows = rows[rows['scheduled_dt'] == query.travel_date]
+    if rows.empty:
+        return f"Train {query.train_no} has no departures {_scope_text(query, with_train=False)}."
+    scope = _scope_text(query)
+    departures = f"{len(rows)} departure{'s' if len(rows) != 1 else ''}"
+    if query.intent == 'delay':
+        return _delay_text(
+            f"for {scope}", len(rows),
+            rows['dep_delay'].sum(), rows['dep_delay'].count(), rows['arr_delay'].sum(), rows['arr_delay'].count(),
+        )
+    if query.intent in ('count', 'busiest'):
+        column, label = (query.column, query.label) if query.intent == 'count' else ('passeneger_counts', 'passengers')
+        total = rows[MEAL_METRIC].to_numpy().sum() if column is None else rows[column].sum()
+        return f"{_sentence(label)} on {scope}: {total:,} over {departures}."
+    first = rows.iloc[0]
+    stations = ', '.join(dict.fromkeys(rows['station'].astype(str)))
+    return (
+        f"Train {query.train_no} runs {first['route']} ({first['carrier']}), departing {stations} "
+        f"at {first['hr']}:00. {departures.capitalize()} between {rows['scheduled_dt'].min()} and {rows['scheduled_dt'].max()}."
+    )
+
+
+def _delay_answer(query, index):
+    daily = index.scope(index.daily, query.station, query.travel_date)
+    departures = daily['departures'].sum()
+    if departures == 0:
+        return f"No departures {_scope_text(query)}."
+    return _delay_text(
+        _scope_text(query), departures,
+        daily['dep_delay'].sum(), daily['dep_delay_recorded'].sum(), daily['arr_delay'].sum(), daily['arr_delay_recorded'].sum(),
+    )
+
+
+def _delay_text(scope, departures, dep_total, dep_recorded, arr_total, arr_recorded):
+    # Averages are over the departures with a recorded delay; a missing one is not a punctual train
+    if dep_recorded == 0 and arr_recorded == 0:
+        if departures == 1:
+            return f"No delay data {scope}: its departure has no recorded delay."
+        return f"No delay data {scope}: none of its {departures} departures has a recorded delay."
+    averages = [
+        f"{total / recorded:.1f} min {direction} over {recorded}" if recorded else f"no data {direction}"
+        for direction, total, recorded in (('departing', dep_total, dep_recorded), ('arriving', arr_total, arr_recorded))
+    ]
+    return f"Average delay {scope}: {averages[0]}, {averages[1]} of {departures} departures."
+
+
+def _busiest_answer(query, index):
+    by_hour = index.scope(index.hourly, query.station, query.travel_date).groupby(level='hr').sum()
+    if by_hour.empty or by_hour.max() == 0:
+        return f"No passengers recorded {_scope_text(query)}."
+    hour = by_hour.idxmax()
+    return f"The busiest hour {_scope_text(query)} is {hour}:00-{hour + 1}:00, with {by_hour.max():,} passengers."
+
+
+def _count_answer(query, index):
+    daily = index.scope(index.daily, query.station, query.travel_date)
+    total = daily[MEAL_METRIC].to_numpy().sum() if query.column is None else daily[query.column].sum()
+    departures = daily['departures'].sum()
+    return f"{_sentence(query.label)} {_scope_text(query)}: {total:,} over {departures} departures."
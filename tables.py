@@ -0,0 +1,51 @@
+"""
+Server-side paging for the dashboards' result tables.
+
+Search and sort run on the server over the filtered rows. Only the page
+being looked at is handed to Streamlit, so what is serialized and sent to
+the browser per interaction is bounded by the page size, not the result size.
+"""
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [25, 50, 100]
+
+
+def search_mask(frame, columns, text):
+    """Rows where any of columns contains text, case-insensitively."""
+    mask = np.zeros(len(frame), dtype=bool)
+    for col in columns:
+        values = frame[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, labels = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, labels = pd.factorize(values)
+        # Columns repeat a few values (stations, counts, hours), so each distinct one is matched once
+        hits = pd.Index(labels).astype(str).str.contains(text, case=False, regex=False)
+        mask |= np.isin(codes, np.flatnonzero(hits))
+    return mask
+
+
+def ordered_positions(frame, columns, search='', sort_by=None, descending=False):
+    """
+    Positions of the rows of frame where one of columns contains search,
+    ordered by sort_by (frame order when None).
+    """
+    positions = np.arange(len(frame))
+    if search:
+        positions = positions[search_mask(frame, columns, search)]
+    if sort_by is not None:
+        keys = frame[sort_by].iloc[positions].reset_index(drop=True)
+        # Stable both ways, so ties keep frame order; categoricals sort by label
+        positions = positions[keys.sort_values(ascending=not descending, kind='stable').index.to_numpy()]
+    return positions
+
+
+def table_page(frame, columns, positions, page, page_size=PAGE_SIZES[0]):
+    """Rows of page (1-based) of positions, restricted to columns."""
+    start = (page - 1) * page_size
+    return frame.iloc[positions[start:start + page_size]][list(columns)]
+
+
+def page_count(matches, page_size):
+    return max(1, -(-matches // page_size))
@@ -0,0 +1,245 @@
+"""Rendering of the Trains tab dashboard charts, with a bounded PNG cache."""
+import functools
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import altair as alt
+import pyarrow as pa
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import profiling
+from caching import LruCache
+
+# (column, label, color, marker) for each line of the hourly count charts
+GROUP_LINES = [
+    ('group', 'Group', 'blue', '*'),
+    ('assistance', 'Assistance', 'orange', '^'),
+    ('duty', 'Duty', 'green', 'v'),
+]
+CLASS_LINES = [
+    ('premier', 'Premier', 'purple', '*'),
+    ('plus', 'Plus', 'red', '^'),
+    ('standard', 'Standard', 'blue', 'v'),
+    ('wheelchair', 'Wheelchair', 'green', 'o'),
+    ('wheelchair_companion', 'Wheelchair Companion', 'yellow', '|'),
+]
+PASSENGER_TYPE_LINES = [
+    ('senior', 'Senior', 'green', '*'),
+    ('adult', 'Adult', 'purple', '^'),
+    ('youth', 'Youth', 'cyan', 'v'),
+    ('child', 'Child', 'orange', 'o'),
+    ('guide_dog', 'Guide Dog', 'pink', '|'),
+]
+# Lines of the three count charts, folded together by the hourly explorer
+EXPLORER_LINES = GROUP_LINES + CLASS_LINES + PASSENGER_TYPE_LINES
+# Vega point shapes closest to the matplotlib markers above
+VEGA_SHAPES = {'*': 'cross', '^': 'triangle-up', 'v': 'triangle-down', 'o': 'circle', '|': 'stroke'}
+# Name of the dataset holding a station/date's rows in the hourly explorer spec
+DAY_ROWS = 'day_rows'
+# (column, vega colour scheme, title) of each pie, in dashboard order
+PIES = [
+    ('route', 'set3', '1. Route By Hour'),
+    ('carrier', 'set2', '2. Carrier By Hour'),
+    ('eq_code', 'set1', '3. Equipment Type By Hour'),
+    ('set_no', 'pastel1', '4. Set Number By Hour'),
+]
+
+# Rendered chart PNGs and Vega-Lite specs keyed on (chart id, data version, filter parameters)
+CHART_CACHE = LruCache(maxsize=256)
+
+
+# Processes rendering static charts concurrently, created on first use
+RENDER_WORKERS = os.cpu_count() or 1
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def render_pool():
+    """
+    Returns the process pool chart_pngs() can render on.
+    Workers are spawned, not forked: forking the threaded Streamlit server is unsafe.
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _render_pool
+
+
+def render_png(fig):
+    """Returns fig as PNG bytes."""
+    buffer = io.BytesIO()
+    # Same output settings st.pyplot uses
+    fig.savefig(buffer, format='png', dpi=200, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def render_chart(draw, args):
+    """Builds draw(*args) and returns it as PNG bytes; also what the render pool workers run."""
+    return render_png(draw(*args))
+
+
+def chart_pngs(charts, params, pool=None):
+    """
+    Returns {chart_id: PNG} for charts, (chart_id, draw, args) triples, under the given filter parameters.
+    Cached PNGs are reused. The others are rendered one after another, or concurrently on pool.
+    """
+    with profiling.span('charts: render'):
+        pngs = {chart_id: CHART_CACHE.get((chart_id, *params)) for chart_id, _, _ in charts}
+        missing = [(chart_id, draw, args) for chart_id, draw, args in charts if pngs[chart_id] is None]
+        if pool is None:
+            rendered = [render_chart(draw, args) for _, draw, args in missing]
+        else:
+            rendered = list(pool.map(render_chart, [draw for _, draw, _ in missing], [args for _, _, args in missing]))
+        for (chart_id, _, _), png in zip(missing, rendered):
+            CHART_CACHE.put((chart_id, *params), png)
+            pngs[chart_id] = png
+        return pngs
+
+
+def chart_spec(chart_id, params, build):
+    """
+    Returns the Vega-Lite spec for chart_id under the given parameters.
+    build() creates it and is only called on a cache miss. Specs are shared,
+    so callers must not modify them.
+    """
+    with profiling.span(f'chart: {chart_id}'):
+        return CHART_CACHE.get_or_compute((chart_id, *params), build)
+
+
+def _figure(figsize):
+    # Built on its own Agg canvas, outside pyplot's global figure registry
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+
+def pie_figure(counts, palette, title):
+    # value_counts() of a categorical also lists the categories absent from the selection
+    counts = counts[counts > 0]
+    fig, ax = _figure((8, 6))
+    ax.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=90, colors=sns.color_palette(palette, len(counts)))
+    ax.set_title(title)
+    return fig
+
+
+def arrival_delay_figure(df):
+    # Trains without a recorded delay are drawn on the baseline, as they always were
+    df = df.fillna({'arr_delay': 0})
+    status = df['arr_delay'].apply(lambda x: 'early' if x <= 0 else 'delayed')
+    fig, ax = _figure((10, 6))
+    sns.scatterplot(data=df.assign(status=status), x='hr', y='arr_delay', hue='status', palette={'early': 'green', 'delayed': 'red'}, ax=ax)
+    ax.axhline(0, color='black', linestyle='--', label="Baseline (on-time)")
+    ax.set_title("Arr Delay vs Hour")
+    ax.set_xlabel('Hour')
+    ax.set_ylabel('Arrival Delay')
+    ax.legend()
+    return fig
+
+
+def hourly_lines_figure(df, lines, title):
+    fig, ax = _figure((10, 6))
+    for column, label, color, marker in lines:
+        sns.lineplot(data=df, x='hr', y=column, label=label, color=color, marker=marker, linewidth=2, ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel('Hour')
+    ax.set_ylabel('Count')
+    ax.legend()
+    return fig
+
+
+def hourly_explorer(day_rows, hours):
+    """
+    Returns the eight Trains charts as one Vega-Lite spec over day_rows, every
+    row of a station/date. The spec is a plain dict with the rows already
+    Arrow-encoded, so st.vega_lite_chart() shows it without validating or
+    converting anything. Two sliders in the chart, over hours (first, last),
+    set its start_hour and end_hour params, which filter and re-aggregate the
+    rows in the browser with the same start <= hr < end rule as the server side.
+    """
+    # Count columns take their legend labels, so folding them needs no lookup
+    data = day_rows[['hr', 'arr_delay'] + [column for column, _, _ in PIES] + [column for column, *_ in EXPLORER_LINES]]
+    data = data.rename(columns={column: label for column, label, _, _ in EXPLORER_LINES}).fillna({'arr_delay': 0})
+    return {**_explorer_template(*hours), 'datasets': {DAY_ROWS: _arrow_bytes(data)}}
+
+
+@functools.lru_cache(maxsize=1)
+def _explorer_template(first_hour, last_hour):
+    # Nothing in the spec depends on the rows, which it reads from the DAY_ROWS dataset,
+    # so Altair builds and validates it once per process
+    start = alt.param(name='start_hour', value=first_hour, bind=_hour_slider(first_hour, last_hour, 'Start hour '))
+    end = alt.param(name='end_hour', value=last_hour, bind=_hour_slider(first_hour, last_hour, 'End hour '))
+    base = alt.Chart(alt.Data(name=DAY_ROWS)).transform_filter((alt.datum.hr >= start) & (alt.datum.hr < end))
+
+    pies = [_pie(base, column, scheme, title) for column, scheme, title in PIES]
+    delays = _arrival_delay(base)
+    group = _hourly_lines(base, GROUP_LINES, '6. Group, Assistance, Duty Counts By Hour')
+    classes = _hourly_lines(base, CLASS_LINES, '7. Premier, Plus, Standard, Wheelchair, Wheelchair Companion Counts By Hour')
+    people = _hourly_lines(base, PASSENGER_TYPE_LINES, '8. Senior, Adult, Youth, Child, Guide Dog Counts By Hour')
+    chart = alt.concat(*pies, delays, group, classes, people, columns=2)
+    return chart.add_params(start, end).resolve_scale(color='independent', shape='independent').to_dict()
+
+
+def _hour_slider(first_hour, last_hour, name):
+    return alt.binding_range(min=first_hour, max=last_hour, step=1, name=name)
+
+
+def _arrow_bytes(frame):
+    # The Arrow IPC stream Streamlit sends chart datasets as; bytes are passed through as they are
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.RecordBatchStreamWriter(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _pie(base, column, scheme, title):
+    counts = (
+        base.transform_aggregate(count='count()', groupby=[column])
+        .transform_joinaggregate(total='sum(count)')
+        .transform_calculate(percent='datum.count / datum.total')
+        .encode(
+            theta=alt.Theta('count:Q', stack=True),
+            order=alt.Order(f'{column}:N'),
+            tooltip=[alt.Tooltip(f'{column}:N'), alt.Tooltip('count:Q'), alt.Tooltip('percent:Q', format='.1%')],
+        )
+        .properties(title=title, width=260, height=260)
+    )
+    arcs = counts.mark_arc(outerRadius=100).encode(color=alt.Color(f'{column}:N', scale=alt.Scale(scheme=scheme)))
+    labels = counts.mark_text(radius=120).encode(text=alt.Text('percent:Q', format='.1%'))
+    return arcs + labels
+
+
+def _arrival_delay(base):
+    status = alt.Color('status:N', scale=alt.Scale(domain=['early', 'delayed'], range=['green', 'red']))
+    points = (
+        base.transform_calculate(status="datum.arr_delay <= 0 ? 'early' : 'delayed'")
+        .mark_point(filled=True)
+        .encode(x=alt.X('hr:Q', title='Hour', scale=alt.Scale(zero=False)), y=alt.Y('arr_delay:Q', title='Arrival Delay'), color=status)
+    )
+    # Baseline (on-time)
+    baseline = alt.Chart(alt.InlineData(values=[{'arr_delay': 0}])).mark_rule(color='black', strokeDash=[4, 4]).encode(y='arr_delay:Q')
+    return (points + baseline).properties(title='5. Arrival Delay By Hour', width=260, height=260)
+
+
+def _hourly_lines(base, lines, title):
+    labels = [label for _, label, _, _ in lines]
+    series = alt.Scale(domain=labels, range=[color for _, _, color, _ in lines])
+    shapes = alt.Scale(domain=labels, range=[VEGA_SHAPES[marker] for *_, marker in lines])
+    return (
+        base.transform_fold(labels, as_=['series', 'count'])
+        .transform_aggregate(count='sum(count)', groupby=['hr', 'series'])
+        .mark_line(point=True, strokeWidth=2)
+        .encode(
+            x=alt.X('hr:Q', title='Hour'),
+            y=alt.Y('count:Q', title='Count'),
+            color=alt.Color('series:N', scale=series, title=None),
+            shape=alt.Shape('series:N', scale=shapes, title=None),
+        )
+        .properties(title=title, width=260, height=260)
+    )
@@ -0,0 +1,658 @@
+"""Loading helpers for the train dataset behind hackthon_app.py."""
+import contextlib
+import dataclasses
+import functools
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import feather
+from pyarrow import fs
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are still serialized between threads
+    fcntl = None
+
+import profiling
+from caching import LruCache
+
+TRAIN_DATA_PATH = 'data/data.csv'
+# Suffixes of the columnar copy and hourly aggregates written next to the CSV by ingest()
+COLUMNAR_SUFFIX = '.feather'
+HOURLY_SUFFIX = '.hourly.feather'
+# Directory holding, per source version, one Arrow IPC file per scheduled_dt
+# (hive style: <mtime_ns>-<size>-<schema>/scheduled_dt=2024-12-30/part-0.feather)
+PARTITIONS_SUFFIX = '.partitions'
+# Written into every copy's source stamp. Bump it whenever _parse_csv() or _compact() change what the
+# copies hold, so copies written by older code are rebuilt even though the CSV has not changed.
+INGEST_SCHEMA_VERSION = 2
+# Lock file held while the copies are rebuilt, so other processes wait instead of rebuilding too
+LOCK_SUFFIX = '.lock'
+# Discovery skips files starting with '_', so the source stamp can live next to the partitions
+PARTITIONS_SOURCE_FILE = '_source.json'
+PARTITIONING = ds.partitioning(pa.schema([('scheduled_dt', pa.date32())]), flavor='hive')
+
+# Low-cardinality text columns, stored as categoricals
+CATEGORICAL_COLUMNS = ['station', 'route', 'carrier', 'eq_code', 'set_no', 'country']
+# Whole minutes, empty in the CSV when the train has no recorded delay. Kept as
+# float32 with NaN there, so averages only count recorded delays
+DELAY_COLUMNS = ['dep_delay', 'arr_delay']
+# Stored as float32, which keeps them to within a metre
+COORDINATE_COLUMNS = ['latitude', 'longitude']
+# Everything else is a whole number, downcast to the smallest integer type that holds it
+INT_COLUMNS = [
+    'train_no', 'zoom', 'hr', 'group', 'assistance', 'duty', 'premier', 'plus', 'standard',
+    'wheelchair_companion', 'wheelchair', 'senior', 'adult', 'youth', 'child', 'guide_dog',
+    '00~02', '03~12', '13~19', '20~29', '30~39', '40~49', '50~59', '60~69', '70~79', '80~89',
+    '90~99', '100+', 'eu_count', 'noneu_count', 'passeneger_counts', 'child_meal',
+    'dairy_free_meal', 'diabetic_meal', 'gluten_free_meal', 'kosher_meal', 'low_fat_meal',
+    'low_salt_meal', 'halal_meal', 'vegan_meal', 'vegetarian_meal', 'standard_meal',
+]
+
+# Count columns the dashboards sum per hour, grouped as they are charted
+GROUP_COLUMNS = ['group', 'assistance', 'duty']
+CLASS_COLUMNS = ['premier', 'plus', 'standard', 'wheelchair', 'wheelchair_companion']
+PASSENGER_TYPE_COLUMNS = ['senior', 'adult', 'youth', 'child', 'guide_dog']
+NATIONALITY_COLUMNS = ['eu_count', 'noneu_count']
+MEAL_COLUMNS = [
+    'child_meal', 'dairy_free_meal', 'diabetic_meal', 'gluten_free_meal', 'kosher_meal',
+    'low_fat_meal', 'low_salt_meal', 'halal_meal', 'vegan_meal', 'vegetarian_meal', 'standard_meal',
+]
+AGE_COLUMNS = [
+    '00~02', '03~12', '13~19', '20~29', '30~39', '40~49',
+    '50~59', '60~69', '70~79', '80~89', '90~99', '100+',
+]
+# Everything the Passenger tab charts, sliced from the hourly cube in one lookup
+PASSENGER_COLUMNS = NATIONALITY_COLUMNS + ['passeneger_counts'] + MEAL_COLUMNS + AGE_COLUMNS
+HOURLY_SUM_COLUMNS = GROUP_COLUMNS + CLASS_COLUMNS + PASSENGER_TYPE_COLUMNS + PASSENGER_COLUMNS
+
+# Types the CSV is parsed with, before _compact() narrows them. Some numbers
+# are quoted in the file, the explicit types make read_csv coerce them all.
+TRAIN_DATA_DTYPES = {
+    **{col: 'object' for col in CATEGORICAL_COLUMNS},
+    **{col: 'float64' for col in DELAY_COLUMNS + COORDINATE_COLUMNS},
+    **{col: 'int64' for col in INT_COLUMNS},
+}
+# Cells read as missing; the CSV writes '-' for an unknown set number
+MISSING_VALUES = ['-']
+
+
+class StationDateHourIndex:
+    """
+    Row positions of a frame grouped by (station, scheduled_dt), each group
+    sorted by hr. A station/date/hour-range lookup is a dict hit plus two
+    binary searches instead of a boolean mask over the whole frame.
+    """
+
+    def __init__(self, df, offset=0, groups=None):
+        # offset is added to positions when df holds rows appended to a larger frame
+        hr = df['hr'].to_numpy()
+        self._groups = dict(groups or {})
+        new_groups = df.groupby(['station', 'scheduled_dt'], observed=True, sort=False).indices
+        for key, positions in new_groups.items():
+            positions, hours = positions + offset, hr[positions]
+            if key in self._groups:
+                old_positions, old_hours = self._groups[key]
+                positions = np.concatenate([old_positions, positions])
+                hours = np.concatenate([old_hours, hours])
+            order = np.argsort(hours, kind='stable')
+            self._groups[key] = (positions[order], hours[order])
+
+    def extended(self, new_rows, offset):
+        """
+        Returns a new index that also covers new_rows, appended at position offset.
+        Only the groups new_rows touch are rebuilt; the rest are shared with self.
+        """
+        return StationDateHourIndex(new_rows, offset, self._groups)
+
+    def positions(self, station, travel_date, start_hour, end_hour):
+        """Returns the row positions with start_hour <= hr < end_hour, in frame order."""
+        group = self._groups.get((station, travel_date))
+        if group is None:
+            return np.empty(0, dtype=np.intp)
+        positions, hours = group
+        start, stop = np.searchsorted(hours, [start_hour, end_hour], side='left')
+        return np.sort(positions[start:stop])
+
+
+class HourlyCube:
+    """
+    Per (station, scheduled_dt, hr) sums of HOURLY_SUM_COLUMNS.
+    Each station/date owns a small block sorted by hr, so an hour-range lookup
+    is a slice of a few dozen rows at most.
+    """
+
+    def __init__(self, frame, blocks=None):
+        self._empty = frame.iloc[:0][['hr'] + HOURLY_SUM_COLUMNS].reset_index(drop=True)
+        self._blocks = dict(blocks or {})
+        for key, block in frame.groupby(['station', 'scheduled_dt'], observed=True, sort=False):
+            block = block[['hr'] + HOURLY_SUM_COLUMNS]
+            if key in self._blocks:
+                block = pd.concat([self._blocks[key], block]).groupby('hr', sort=True)[HOURLY_SUM_COLUMNS].sum().reset_index()
+            self._blocks[key] = block.sort_values('hr', kind='stable').reset_index(drop=True)
+
+    def merged(self, new_rows):
+        """
+        Returns a new cube with the sums of new_rows (raw dataset rows) added in.
+        Only the station/date blocks new_rows touch are rebuilt.
+        """
+        return HourlyCube(_aggregate_hourly(new_rows), self._blocks)
+
+    def sums(self, station, travel_date, start_hour, end_hour, columns=HOURLY_SUM_COLUMNS):
+        """
+        Returns hr plus the summed columns for start_hour <= hr < end_hour, one row per hour.
+        Same result as filter(...).groupby('hr')[columns].sum().reset_index().
+        """
+        columns = ['hr'] + list(columns)
+        block = self._blocks.get((station, travel_date), self._empty)
+        first, last = np.searchsorted(block['hr'].to_numpy(), [start_hour, end_hour], side='left')
+        return block.iloc[first:last][columns].reset_index(drop=True)
+
+
+@dataclass(frozen=True)
+class TrainDataset:
+    """Parsed train data plus the widget metadata every tab needs."""
+    frame: pd.DataFrame
+    stations: list
+    min_date: date
+    max_date: date
+    # None when the frame was loaded without the station/scheduled_dt/hr columns
+    index: StationDateHourIndex = None
+    # (mtime_ns, size) of the source CSV, for keying anything derived from the data
+    version: tuple = None
+    # Columns returned by filter() when frame holds more than the caller asked for
+    columns: tuple = None
+
+    def filter(self, station, travel_date, start_hour, end_hour):
+        """
+        Returns the rows for station on travel_date with start_hour <= hr < end_hour.
+        Same rows, in the same order, as the equivalent boolean mask over frame.
+        """
+        rows = self.frame.iloc[self.index.positions(station, travel_date, start_hour, end_hour)]
+        return rows if self.columns is None else rows[list(self.columns)]
+
+    @property
+    def column_names(self):
+        return self.columns if self.columns is not None else tuple(self.frame.columns)
+
+
+def load_dataset(path=TRAIN_DATA_PATH, columns=None):
+    """
+    Returns the parsed dataset for path, restricted to columns when given.
+    The file is only re-read when its modification time or size changes.
+    """
+    stat = os.stat(path)
+    columns = tuple(columns) if columns is not None else None
+    return _read_dataset(path, stat.st_mtime_ns, stat.st_size, columns)
+
+
+def columnar_path(path):
+    return os.path.splitext(path)[0] + COLUMNAR_SUFFIX
+
+
+def hourly_path(path):
+    return os.path.splitext(path)[0] + HOURLY_SUFFIX
+
+
+def partitions_path(path):
+    return os.path.splitext(path)[0] + PARTITIONS_SUFFIX
+
+
+def load_hourly(path=TRAIN_DATA_PATH):
+    """
+    Returns the HourlyCube for path, built at ingest time.
+    Like load_dataset(), it is only re-read when the CSV changes.
+    """
+    stat = os.stat(path)
+    return _read_hourly(path, stat.st_mtime_ns, stat.st_size)
+
+
+def ingest(path=TRAIN_DATA_PATH):
+    """
+    Converts the CSV at path into an uncompressed Arrow IPC (Feather) file,
+    plus a second one holding the hourly aggregates and a directory of the
+    same rows partitioned by scheduled_dt for range queries.
+    The source mtime and size, and INGEST_SCHEMA_VERSION, are stored with each
+    copy so a stale one is detected and rebuilt. Returns the path of the columnar file.
+    """
+    stat = os.stat(path)
+    return _ensure_columnar(path, stat.st_mtime_ns, stat.st_size)
+
+
+# Streamlit sessions are threads of one process: only one of them rebuilds, the others wait for its copies
+_REBUILD_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def rebuild_lock(path):
+    """
+    Held while the copies derived from the CSV at path are checked and rebuilt,
+    by one thread of this process and, through a lock file, one process.
+    Not re-entrant.
+    """
+    with _REBUILD_LOCK, open(os.path.splitext(path)[0] + LOCK_SUFFIX, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _ensure_columnar(path, mtime_ns, size):
+    out_path = columnar_path(path)
+    source = _source_stamp(mtime_ns, size)
+    if _copies_current(path, source):
+        return out_path
+    with rebuild_lock(path):
+        # Another thread or process may have rebuilt them while this one waited
+        if _copies_current(path, source):
+            return out_path
+        df = _parse_csv(path)
+        _write_feather(df, out_path, source)
+        _write_feather(_aggregate_hourly(df), hourly_path(path), source)
+        _write_partitions(df, partitions_path(path), source)
+    return out_path
+
+
+def _source_stamp(mtime_ns, size):
+    # What a copy was built from, and by which version of the ingest code
+    return {
+        b'source_mtime_ns': str(mtime_ns).encode(),
+        b'source_size': str(size).encode(),
+        b'ingest_schema': str(INGEST_SCHEMA_VERSION).encode(),
+    }
+
+
+def _copies_current(path, source):
+    return (
+        _is_current(columnar_path(path), source)
+        and _is_current(hourly_path(path), source)
+        and _partitions_current(partitions_path(path), source)
+    )
+
+
+def _is_current(out_path, source):
+    if not os.path.exists(out_path):
+        return False
+    with pa.memory_map(out_path) as source_file:
+        metadata = pa.ipc.open_file(source_file).schema.metadata or {}
+    return all(metadata.get(key) == value for key, value in source.items())
+
+
+def _write_feather(df, out_path, source):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **source})
+    # Write to a temporary file first so concurrent readers never see a partial file
+    tmp_path = _temp_path(out_path)
+    try:
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _temp_path(out_path):
+    """A new, empty file beside out_path, unique to this call."""
+    handle, tmp_path = tempfile.mkstemp(prefix=os.path.basename(out_path) + '.', suffix='.tmp', dir=os.path.dirname(out_path) or '.')
+    os.close(handle)
+    return tmp_path
+
+
+def _partitions_current(out_dir, source):
+    try:
+        with open(os.path.join(_version_dir(out_dir, source), PARTITIONS_SOURCE_FILE)) as source_file:
+            stamp = json.load(source_file)
+    except FileNotFoundError:
+        return False
+    return all(stamp.get(key.decode()) == value.decode() for key, value in source.items())
+
+
+def _version_dir(out_dir, source):
+    # Each version of the CSV gets its own directory, so a rebuild never moves the one readers scan
+    return os.path.join(out_dir, '-'.join(value.decode() for value in source.values()))
+
+
+def _write_partitions(df, out_dir, source):
+    version_dir = _version_dir(out_dir, source)
+    os.makedirs(out_dir, exist_ok=True)
+    # Built in a directory unique to this call and renamed into place in one step,
+    # so readers never see a half-written set
+    tmp_dir = tempfile.mkdtemp(prefix='.', suffix='.tmp', dir=out_dir)
+    try:
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            tmp_dir,
+            format='ipc',
+            partitioning=PARTITIONING,
+            basename_template='part-{i}.feather',
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        with open(os.path.join(tmp_dir, PARTITIONS_SOURCE_FILE), 'w') as source_file:
+            json.dump({key.decode(): value.decode() for key, value in source.items()}, source_file)
+        # Left without its stamp by a rebuild that was interrupted, so nothing reads it
+        shutil.rmtree(version_dir, ignore_errors=True)
+        os.rename(tmp_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    # Older versions, and anything left by interrupted rebuilds; rebuilds hold the
+    # rebuild lock, so no other one is writing here. Files a reader still has open
+    # stay readable until it closes them
+    for name in os.listdir(out_dir):
+        entry = os.path.join(out_dir, name)
+        if entry == version_dir:
+            continue
+        if os.path.isdir(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            os.remove(entry)
+
+
+def _aggregate_hourly(df):
+    keys = ['station', 'scheduled_dt', 'hr']
+    return df.groupby(keys, observed=True, sort=True)[HOURLY_SUM_COLUMNS].sum().reset_index()
+
+
+def _parse_csv(path):
+    # path may also be a file-like object, e.g. the header plus an appended tail
+    df = pd.read_csv(path, dtype=TRAIN_DATA_DTYPES, na_values=MISSING_VALUES, parse_dates=['scheduled_dt'])
+    df['scheduled_dt'] = df['scheduled_dt'].dt.date
+    return _compact(df)
+
+
+def _compact(df):
+    """
+    Cleans and narrows a freshly parsed frame, once, at ingest.
+    Missing delays stay NaN, an unknown delay is not a punctual train; the
+    other missing values become 0 ('0' in text columns), as the dashboards
+    have always shown them, so filtered rows can be used without a cleaning pass.
+    """
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].fillna('0').astype('category')
+    for col in DELAY_COLUMNS:
+        df[col] = df[col].astype('float32')
+    for col in COORDINATE_COLUMNS:
+        df[col] = df[col].astype('float32')
+    for col in INT_COLUMNS:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+def display_delays(df):
+    """df with its delays as whole minutes, unrecorded ones as 0, the way the tables have always shown them."""
+    delays = [col for col in DELAY_COLUMNS if col in df.columns]
+    return df.fillna({col: 0 for col in delays}).astype({col: 'int16' for col in delays})
+
+
+def memory_report(df):
+    """Returns dtype and resident bytes (strings included) for each column of df, largest first."""
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': df.memory_usage(index=False, deep=True)})
+    return report.sort_values('bytes', ascending=False)
+
+
+@functools.lru_cache(maxsize=8)
+def _read_dataset(path, mtime_ns, size, columns):
+    # Memory-mapped and uncompressed, so numeric columns without nulls are not copied
+    table = feather.read_table(
+        _ensure_columnar(path, mtime_ns, size),
+        columns=list(columns) if columns is not None else None,
+        memory_map=True,
+    )
+    df = table.to_pandas(split_blocks=True)
+    return TrainDataset(
+        frame=df,
+        stations=list(df['station'].unique()),
+        min_date=df['scheduled_dt'].min(),
+        max_date=df['scheduled_dt'].max(),
+        index=StationDateHourIndex(df) if {'station', 'scheduled_dt', 'hr'} <= set(df.columns) else None,
+        version=(mtime_ns, size),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _read_hourly(path, mtime_ns, size):
+    _ensure_columnar(path, mtime_ns, size)
+    return HourlyCube(feather.read_table(hourly_path(path), memory_map=True).to_pandas(split_blocks=True))
+
+
+@functools.lru_cache(maxsize=1)
+def _partitioned_dataset(path, mtime_ns, size):
+    _ensure_columnar(path, mtime_ns, size)
+    # Discovery only lists the directory; files are opened (memory-mapped) by the scans that need them
+    return ds.dataset(
+        _version_dir(partitions_path(path), _source_stamp(mtime_ns, size)),
+        format='ipc',
+        partitioning=PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+# Range query results keyed on (data version, stations, start date, end date, columns)
+RANGE_CACHE = LruCache(maxsize=32)
+
+
+def load_range(path, stations, start_date, end_date, columns):
+    """
+    Returns the rows of stations from start_date to end_date (both included),
+    restricted to columns plus station and scheduled_dt. The date bounds prune
+    the scheduled_dt partitions, so only the days in range are opened; the
+    station test runs inside the scan of those files.
+    """
+    stat = os.stat(path)
+    columns = tuple(dict.fromkeys(['station', 'scheduled_dt', *columns]))
+    key = ((stat.st_mtime_ns, stat.st_size), tuple(stations), start_date, end_date, columns)
+    def scan():
+        dataset = _partitioned_dataset(path, stat.st_mtime_ns, stat.st_size)
+        predicate = (
+            (ds.field('scheduled_dt') >= start_date)
+            & (ds.field('scheduled_dt') <= end_date)
+            & ds.field('station').isin(list(stations))
+        )
+        return dataset.to_table(columns=list(columns), filter=predicate).to_pandas(split_blocks=True)
+    return RANGE_CACHE.get_or_compute(key, scan)
+
+
+def range_rows(frame, stations, start_date, end_date, columns):
+    """load_range() over a frame already in memory, for live data that has no partitions."""
+    columns = list(dict.fromkeys(['station', 'scheduled_dt', *columns]))
+    mask = frame['station'].isin(stations) & (frame['scheduled_dt'] >= start_date) & (frame['scheduled_dt'] <= end_date)
+    return frame.loc[mask, columns].reset_index(drop=True)
+
+
+ROLLUP_GRAINS = ('day', 'week', 'hour')
+
+
+def rollup(rows, grain, metrics, by_station=False):
+    """
+    Sums metrics over rows per day, per week (starting Monday) or per hour of
+    the day, with the number of departures and, when rows hold them, the mean
+    delays. A mean only counts the recorded delays, and is NaN for a period
+    with none; *_recorded says how many it averages. With by_station there is
+    one row per period and station.
+    """
+    if grain == 'hour':
+        period = rows['hr']
+    elif grain == 'day':
+        period = rows['scheduled_dt']
+    elif grain == 'week':
+        days = pd.to_datetime(rows['scheduled_dt'])
+        period = (days - pd.to_timedelta(days.dt.weekday, unit='D')).dt.date
+    else:
+        raise ValueError(f'unknown grain {grain!r}, expected one of {ROLLUP_GRAINS}')
+    keys = [period.rename(grain)] + ([rows['station']] if by_station else [])
+    grouped = rows.groupby(keys, observed=True, sort=True)
+    result = grouped[list(metrics)].sum()
+    result['departures'] = grouped.size()
+    for col in DELAY_COLUMNS:
+        if col in rows.columns:
+            # mean() and count() skip the missing delays; float64 so the rounded means print as they read
+            result[f'mean_{col}'] = grouped[col].mean().astype('float64').round(1)
+            result[f'{col}_recorded'] = grouped[col].count()
+    return result.reset_index()
+
+
+class FilteredView:
+    """
+    A cleaned filter result plus the artifacts derived from it (markers, ...).
+    Views are shared between sessions, so frame must be treated as read-only.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def artifact(self, name, build):
+        """Returns build(frame), computed once per view and kept under name."""
+        with self._lock:
+            if name not in self._artifacts:
+                self._artifacts[name] = build(self.frame)
+            return self._artifacts[name]
+
+
+# Filter results keyed on (data version, columns, station, date, start_hour, end_hour)
+FILTER_CACHE = LruCache(maxsize=128)
+
+
+def filtered_view(dataset, station, travel_date, start_hour, end_hour):
+    """
+    Returns the FilteredView for a dashboard selection.
+    The key is the widget values, so no request ever hashes a DataFrame.
+    """
+    key = (dataset.version, dataset.column_names, station, travel_date, start_hour, end_hour)
+    return FILTER_CACHE.get_or_compute(key, lambda: _build_view(dataset, station, travel_date, start_hour, end_hour))
+
+
+def _build_view(dataset, station, travel_date, start_hour, end_hour):
+    with profiling.span('index lookup'):
+        rows = dataset.filter(station, travel_date, start_hour, end_hour)
+    # Rows are cleaned once at ingest, so the slice is used as it is
+    return FilteredView(rows)
+
+
+class LiveTrainData:
+    """
+    The full dataset kept in memory while rows are appended to the CSV.
+    refresh() parses only the complete lines added since the last call and
+    merges them into the frame, the filter index and the hourly cube. A file
+    that shrank or got a new header is reloaded from scratch.
+    """
+
+    def __init__(self, path=TRAIN_DATA_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reload()
+
+    def dataset(self, columns=None):
+        """Returns the current TrainDataset; filter() yields only columns when given."""
+        dataset = self._dataset
+        return dataset if columns is None else dataclasses.replace(dataset, columns=tuple(columns))
+
+    @property
+    def hourly(self):
+        return self._hourly
+
+    def refresh(self):
+        """Merges rows appended since the last refresh. Returns the number of new rows."""
+        with self._lock:
+            stat = os.stat(self.path)
+            if stat.st_size < self.offset or self._read_header() != self._header:
+                self._reload()
+                return len(self._dataset.frame)
+            if stat.st_size == self.offset:
+                return 0
+            with open(self.path, 'rb') as source_file:
+                source_file.seek(self.offset)
+                tail = source_file.read(stat.st_size - self.offset)
+            # A trailing partial line is left for the next refresh
+            end = tail.rfind(b'\n') + 1
+            if end == 0:
+                return 0
+            new_rows = _parse_csv(io.BytesIO(self._header + tail[:end]))
+            self.offset += end
+            self._append(new_rows, (stat.st_mtime_ns, self.offset))
+            return len(new_rows)
+
+    def _read_header(self):
+        with open(self.path, 'rb') as source_file:
+            return source_file.readline()
+
+    def _reload(self):
+        with open(self.path, 'rb') as source_file:
+            content = source_file.read()
+        end = content.rfind(b'\n') + 1
+        df = _parse_csv(io.BytesIO(content[:end]))
+        self._header = content[:content.index(b'\n') + 1]
+        self.offset = end
+        self._dataset = TrainDataset(
+            frame=df,
+            stations=list(df['station'].unique()),
+            min_date=df['scheduled_dt'].min(),
+            max_date=df['scheduled_dt'].max(),
+            index=StationDateHourIndex(df),
+            version=(os.stat(self.path).st_mtime_ns, self.offset),
+        )
+        self._hourly = HourlyCube(_aggregate_hourly(df))
+
+    def _append(self, new_rows, version):
+        old = self._dataset
+        frame = old.frame
+        # Categoricals only concatenate as categoricals when both sides share categories. The
+        # resident columns are only recoded when the new rows bring a category they lack, and
+        # on a shallow copy, so the concat below is the one copy of the whole frame
+        recoded = {}
+        for col in CATEGORICAL_COLUMNS:
+            categories = frame[col].cat.categories
+            if not new_rows[col].cat.categories.isin(categories).all():
+                # Kept sorted, as read_csv left them, so categoricals still sort by label
+                categories = categories.union(new_rows[col].cat.categories)
+                recoded[col] = frame[col].cat.set_categories(categories)
+            new_rows[col] = new_rows[col].cat.set_categories(categories)
+        if recoded:
+            frame = frame.copy(deep=False)
+            for col, values in recoded.items():
+                frame[col] = values
+        new_stations = [station for station in new_rows['station'].unique() if station not in old.stations]
+        self._dataset = TrainDataset(
+            frame=pd.concat([frame, new_rows], ignore_index=True),
+            stations=old.stations + new_stations,
+            min_date=min(old.min_date, new_rows['scheduled_dt'].min()),
+            max_date=max(old.max_date, new_rows['scheduled_dt'].max()),
+            index=old.index.extended(new_rows, len(frame)),
+            version=version,
+        )
+        self._hourly = self._hourly.merged(new_rows)
+
+
+_LIVE_DATA = {}
+_LIVE_DATA_LOCK = threading.Lock()
+
+
+def live_data(path=TRAIN_DATA_PATH):
+    """Returns the process-wide LiveTrainData for path, refreshed with any appended rows."""
+    with _LIVE_DATA_LOCK:
+        if path not in _LIVE_DATA:
+            _LIVE_DATA[path] = LiveTrainData(path)
+    live = _LIVE_DATA[path]
+    live.refresh()
+    return live
+
+
+if __name__ == '__main__':
+    print(ingest())
+    print(hourly_path(TRAIN_DATA_PATH))
+    print(partitions_path(TRAIN_DATA_PATH))
+    raw = memory_report(pd.read_csv(TRAIN_DATA_PATH))
+    compact = memory_report(_parse_csv(TRAIN_DATA_PATH))
+    report = raw.join(compact, lsuffix='_csv', rsuffix='_compact').sort_values('bytes_csv', ascending=False)
+    print(report.to_string())
+    print(f"total: {raw['bytes'].sum() / 1e6:.2f} MB -> {compact['bytes'].sum() / 1e6:.2f} MB")
@@ -0,0 +1,132 @@
+"""Marker building for the Train Information Map in hackthon_app.py."""
+import re
+
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+import train_data
+
+# (label, column) pairs shown in the detail panel of a clicked train, in display order
+DETAIL_FIELDS = [
+    ('Train', 'train_no'), ('Date', 'scheduled_dt'), ('Hour', 'hr'), ('Route', 'route'),
+    ('Carrier', 'carrier'), ('Equipment', 'eq_code'), ('Set', 'set_no'), ('Station', 'station'),
+    ('Country', 'country'), ('DepartureDelay', 'dep_delay'), ('ArrivalDelay', 'arr_delay'),
+    ('Group', 'group'), ('Assistance', 'assistance'), ('Duty', 'duty'), ('Premier', 'premier'),
+    ('Plus', 'plus'), ('Standard', 'standard'), ('Wheelchair', 'wheelchair'),
+    ('WheelchairCompanion', 'wheelchair_companion'), ('Senior', 'senior'), ('Adult', 'adult'),
+    ('Youth', 'youth'), ('Child', 'child'), ('GuideDog', 'guide_dog'),
+]
+
+# Markers only carry their train number, as the tooltip; the details are looked up when one is clicked
+MARKER_TOOLTIP = 'Train {}'
+# pydeck layer id, the key of its selected objects
+DECK_LAYER_ID = 'trains'
+
+_MASK64 = (1 << 64) - 1
+_TRAIN_NO = re.compile(r'\d+')
+
+
+def _unit_hash(keys, salt):
+    """
+    Maps integer keys to floats in [0, 1) with a splitmix64 mix.
+    The same key and salt always give the same value, in any process.
+    """
+    x = keys.astype(np.uint64) + np.uint64((salt * 0x9E3779B97F4A7C15) & _MASK64)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def marker_rgba(train_no):
+    """
+    Returns the r, g, b and alpha channels (0-255) for each train number.
+    Dark RGB channels (0-100) with alpha 100-255, as the random colours used to be.
+    """
+    keys = np.asarray(train_no)
+    r, g, b = (np.floor(_unit_hash(keys, salt) * 101).astype(int) for salt in (1, 2, 3))
+    alpha = np.floor(_unit_hash(keys, 4) * 156).astype(int) + 100
+    return r, g, b, alpha
+
+
+def marker_colors(train_no):
+    """Returns one 'rgba(r, g, b, a)' string per train number."""
+    r, g, b, alpha = marker_rgba(train_no)
+    rgb = [pd.Series(channel).astype(str) for channel in (r, g, b)]
+    hundredths = pd.Series(np.rint(alpha / 255 * 100).astype(int))
+    alpha_text = ('0.' + hundredths.astype(str).str.zfill(2)).where(hundredths < 100, '1.00')
+    return ('rgba(' + rgb[0] + ', ' + rgb[1] + ', ' + rgb[2] + ', ' + alpha_text + ')').to_numpy()
+
+
+def _jitter(df, max_variation):
+    keys = df['train_no'].to_numpy()
+    lat_variation = (_unit_hash(keys, 5) * 2 - 1) * max_variation
+    lon_variation = (_unit_hash(keys, 6) * 2 - 1) * max_variation
+    return (
+        df['latitude'].to_numpy(dtype=float) + lat_variation,
+        df['longitude'].to_numpy(dtype=float) + lon_variation,
+    )
+
+
+def build_markers(df, max_variation=0.001):
+    """
+    Returns a frame with lat, lon, color and train_no columns, one row per row of df.
+    Jitter and colour are derived from train_no, so a train keeps its marker
+    across reruns and sessions without any state being stored.
+    """
+    lat, lon = _jitter(df, max_variation)
+    return pd.DataFrame({
+        'lat': lat,
+        'lon': lon,
+        'color': marker_colors(df['train_no'].to_numpy()),
+        'train_no': df['train_no'].to_numpy(),
+    }, index=df.index)
+
+
+def build_deck(df, max_variation=0.001):
+    """
+    Returns a pydeck Deck drawing every row of df in one ScatterplotLayer.
+    Markers match build_markers(): each point carries its position, colour
+    and train number, the only field a selection returns.
+    """
+    lat, lon = _jitter(df, max_variation)
+    r, g, b, alpha = marker_rgba(df['train_no'].to_numpy())
+    data = pd.DataFrame({'lat': lat, 'lon': lon, 'r': r, 'g': g, 'b': b, 'a': alpha, 'train_no': df['train_no'].to_numpy()})
+    layer = pdk.Layer(
+        'ScatterplotLayer',
+        id=DECK_LAYER_ID,
+        data=data,
+        get_position='[lon, lat]',
+        get_fill_color='[r, g, b, a]',
+        get_radius=5,
+        radius_units='pixels',
+        pickable=True,
+    )
+    first = df.iloc[0]
+    view_state = pdk.ViewState(latitude=float(first['latitude']), longitude=float(first['longitude']), zoom=int(first['zoom']))
+    tooltip = {'text': MARKER_TOOLTIP.format('{train_no}')}
+    return pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip, map_style='light')
+
+
+def clicked_train(tooltip):
+    """Returns the train number in a clicked marker's tooltip text, None when nothing was clicked."""
+    found = _TRAIN_NO.search(tooltip or '')
+    return int(found.group()) if found else None
+
+
+def train_index(df):
+    """Row positions of each train_no in df."""
+    return df.groupby('train_no', sort=False).indices
+
+
+def train_details(df, positions):
+    """DETAIL_FIELDS of the rows at positions, one column per departure, labels as the index."""
+    rows = train_data.display_delays(df.iloc[positions])
+    details = rows[[col for _, col in DETAIL_FIELDS]].astype(str).T
+    details.index = [label for label, _ in DETAIL_FIELDS]
+    # Headed by station and hour, numbered when a train leaves the same station twice in one hour
+    labels = rows['station'].astype(str) + ' ' + rows['hr'].astype(str) + ':00'
+    repeats = labels.groupby(labels).cumcount()
+    details.columns = [label if n == 0 else f'{label} ({n + 1})' for label, n in zip(labels, repeats)]
+    return details